@@ -1,14 +1,21 @@
 """
 Scio Backend Configuration
 """
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
 import os
+import re
 
 
 class Settings(BaseSettings):
     """Application settings loaded from environment variables."""
-    
+
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore"
+    )
+
     # App Info
     app_name: str = "Scio"
     app_description: str = "IT Helpdesk RAG Chatbot"
@@ -35,22 +42,24 @@ class Settings(BaseSettings):
     
     # Embedding Model
     embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"
+    # Optional directory with an ONNX (e.g. INT8-quantized) export of the
+    # embedding model; used when set and optimum[onnxruntime] is installed
+    embedding_onnx_path: str = ""
     
     # Database
     database_url: str = "sqlite:///./data/scio.db"
+    # Disk-backed semantic response cache (empty string disables it)
+    response_cache_path: str = "./data/llm_cache.db"
     
     # RAG Settings
     chunk_size: int = 800
     chunk_overlap: int = 150
     top_k_results: int = 3  # Show fewer, more relevant sources
+    max_history_turns: int = 20  # Cap on messages loaded for prompt history
+    max_history_tokens: int = 1500  # Prompt-token budget for attached history
     
     # Dataset Path
     dataset_path: str = "../Dataset"
-    
-    class Config:
-        env_file = ".env"
-        env_file_encoding = "utf-8"
-        extra = "ignore"
 
 
 @lru_cache()
@@ -59,8 +68,17 @@ def get_settings() -> Settings:
     return Settings()
 
 
-# System prompt for the IT Helpdesk assistant
-SYSTEM_PROMPT = """You are Scio, an intelligent IT Helpdesk assistant. You are STRICTLY limited to helping users with IT and Technology-related issues ONLY.
+# Module-level singleton so hot paths can import the instance directly
+# instead of going through the lru_cache wrapper on every call
+settings = get_settings()
+
+
+# System prompt for the IT Helpdesk assistant.
+#
+# Split into a static part and a per-query context block: backends cache
+# prompt prefixes, so keeping the dynamic context out of the static text
+# lets every request reuse the cached instruction tokens.
+SYSTEM_STATIC = """You are Scio, an intelligent IT Helpdesk assistant. You are STRICTLY limited to helping users with IT and Technology-related issues ONLY.
 
 ALLOWED TOPICS:
 - Troubleshooting (WiFi, printers, software errors, blue screens, network issues)
@@ -119,15 +137,19 @@ CRITICAL RULES:
 8. Keep responses concise but complete.
 9. You may respond in Indonesian or English depending on the user's language.
 
-Context from knowledge base:
-{context}
-
-Remember: 
+Remember:
 - NEVER answer non-IT questions, even if you know the answer.
-- NEVER make up information. Only use what's provided in the context above.
+- NEVER make up information. Only use what's provided in the context.
 - When context says "No relevant information found", use the FALLBACK response with helpful links.
 - When in doubt about whether a topic is IT-related, politely decline."""
 
+# Per-query context block, sent after the static instructions
+SYSTEM_CONTEXT_TEMPLATE = """Context from knowledge base:
+{context}"""
+
+# Combined single-block form (legacy callers and offline scripts)
+SYSTEM_PROMPT = SYSTEM_STATIC + "\n\n" + SYSTEM_CONTEXT_TEMPLATE
+
 
 # Critical issue keywords for alert detection
 CRITICAL_KEYWORDS = [
@@ -135,3 +157,12 @@ CRITICAL_KEYWORDS = [
     "virus", "malware", "hacked", "unauthorized access", "system compromised",
     "data leak", "firewall down", "ddos", "attack"
 ]
+
+# Precompiled single-pass matcher so detection is one DFA scan instead of
+# one substring search per keyword (plus a lowercased copy of the text).
+# No word boundaries: this must match anywhere in the text, exactly like
+# the substring checks it replaces ("attacks", "viruses", "data leaks")
+CRITICAL_REGEX = re.compile(
+    "|".join(re.escape(k) for k in CRITICAL_KEYWORDS),
+    re.IGNORECASE
+)
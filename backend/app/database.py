@@ -2,27 +2,71 @@
 SQLite Database Setup for Chat History
 """
 import os
-from sqlalchemy import create_engine, Column, String, DateTime, Text, Integer, ForeignKey, Boolean
+from sqlalchemy import create_engine, event, func, text, Column, String, DateTime, Text, Integer, Float, ForeignKey, Boolean, Index
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
-from datetime import datetime, timezone
 import uuid
 
-from app.config import get_settings
+from app.config import settings
+
+try:
+    from uuid_utils import uuid7
+except ImportError:
+    uuid7 = None
+
+
+def generate_uuid() -> str:
+    """Generate a primary-key UUID string.
+
+    Prefers time-ordered UUIDv7 so inserts stay append-only in the PK
+    index (no random page splits); falls back to uuid4 when uuid-utils
+    is not installed.
+    """
+    return str(uuid7() if uuid7 is not None else uuid.uuid4())
 
-settings = get_settings()
 
 # Ensure data directory exists
 os.makedirs("data", exist_ok=True)
 
-# Create engine
+# Create engine (sync - used for table creation and background scripts)
 engine = create_engine(
     settings.database_url,
-    connect_args={"check_same_thread": False}  # Needed for SQLite
+    connect_args={"check_same_thread": False, "timeout": 30}  # Needed for SQLite
 )
 
-# Create session factory
+# Async engine for request handlers: queries suspend on the event loop
+# instead of blocking it
+async_engine = create_async_engine(
+    settings.database_url.replace("sqlite://", "sqlite+aiosqlite://", 1),
+    connect_args={"timeout": 30}
+)
+
+
+@event.listens_for(engine, "connect")
+@event.listens_for(async_engine.sync_engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune SQLite for concurrent readers + a single writer."""
+    cursor = dbapi_connection.cursor()
+    # SQLite leaves FK enforcement off by default; Core DELETEs rely on
+    # the ON DELETE CASCADE clauses rather than ORM cascades
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+# Create session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False so handlers can read attributes after commit
+# without triggering an implicit (and under asyncio, illegal) refresh
+AsyncSessionLocal = async_sessionmaker(
+    autocommit=False, autoflush=False, bind=async_engine, expire_on_commit=False
+)
 
 # Base class for models
 Base = declarative_base()
@@ -31,32 +75,98 @@ Base = declarative_base()
 class ConversationDB(Base):
     """Conversation table."""
     __tablename__ = "conversations"
-    
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    __table_args__ = (
+        # Matches the list ordering (pinned first, most recent next)
+        Index("ix_conversations_pinned_updated", "is_pinned", "updated_at"),
+    )
+
+    id = Column(String(36), primary_key=True, default=generate_uuid)
     title = Column(String(255), default="New Conversation")
     is_pinned = Column(Boolean, default=False)
-    created_at = Column(DateTime, default=datetime.now)
-    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     
     # Relationship
-    messages = relationship("MessageDB", back_populates="conversation", cascade="all, delete-orphan")
+    messages = relationship(
+        "MessageDB",
+        back_populates="conversation",
+        cascade="all, delete-orphan",
+        order_by="MessageDB.timestamp"
+    )
 
 
 class MessageDB(Base):
     """Message table."""
     __tablename__ = "messages"
-    
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    __table_args__ = (
+        # History fetches and per-conversation aggregates become index
+        # range scans instead of table scans + sorts
+        Index("ix_messages_conv_ts", "conversation_id", "timestamp"),
+        # Partial index for the feedback path's previous-user-question
+        # lookup; only user rows are indexed
+        Index(
+            "ix_messages_user", "conversation_id", "timestamp",
+            sqlite_where=text("role = 'user'")
+        ),
+    )
+
+    # Fetch server-generated timestamps back on flush (INSERT .. RETURNING)
+    __mapper_args__ = {"eager_defaults": True}
+
+    id = Column(String(36), primary_key=True, default=generate_uuid)
     conversation_id = Column(String(36), ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False)
     role = Column(String(20), nullable=False)  # user, assistant, system
     content = Column(Text, nullable=False)
-    timestamp = Column(DateTime, default=datetime.now)
+    # Fractional seconds: SQLite's CURRENT_TIMESTAMP has one-second
+    # resolution, and the user/assistant rows of a turn are inserted in
+    # the same flush - they must not collapse to equal timestamps
+    timestamp = Column(
+        DateTime,
+        server_default=text("(strftime('%Y-%m-%d %H:%M:%f','now'))")
+    )
     feedback = Column(String(20), nullable=True)  # thumbs_up, thumbs_down
-    sources_json = Column(Text, nullable=True)  # JSON string of source documents
+    sources_json = Column(Text, nullable=True)  # Legacy JSON blob (kept for old rows)
     is_critical = Column(Boolean, default=False)
-    
-    # Relationship
+
+    # Relationships
     conversation = relationship("ConversationDB", back_populates="messages")
+    sources = relationship("MessageSourceDB", back_populates="message", cascade="all, delete-orphan")
+
+
+class MessageSourceDB(Base):
+    """Source document reference for an assistant message.
+
+    Normalized replacement for the sources_json TEXT blob, so reads can
+    select only the columns they need instead of re-parsing JSON.
+    """
+    __tablename__ = "message_sources"
+    __table_args__ = (
+        Index("ix_message_sources_message", "message_id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    message_id = Column(String(36), ForeignKey("messages.id", ondelete="CASCADE"), nullable=False)
+    content = Column(Text, nullable=False)
+    source = Column(String(255), nullable=False)
+    metadata_json = Column(Text, nullable=True)  # JSON string of extra metadata
+    relevance_score = Column(Float, nullable=True)
+
+    # Relationship
+    message = relationship("MessageDB", back_populates="sources")
+
+
+class CustomModelDB(Base):
+    """Registry of custom fine-tuned models.
+
+    Replaces the per-model Modelfile stat in listing paths; the file on
+    disk remains for auditing only.
+    """
+    __tablename__ = "custom_models"
+
+    name = Column(String(100), primary_key=True)
+    base_model = Column(String(100), nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+    modelfile_path = Column(String(255), nullable=True)
 
 
 class IngestionLogDB(Base):
@@ -64,7 +174,7 @@ class IngestionLogDB(Base):
     __tablename__ = "ingestion_logs"
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    timestamp = Column(DateTime, default=datetime.now)
+    timestamp = Column(DateTime, server_default=func.now())
     source_file = Column(String(255), nullable=False)
     documents_count = Column(Integer, default=0)
     status = Column(String(50), default="success")  # success, failed
@@ -77,9 +187,15 @@ def init_db():
 
 
 def get_db():
-    """Get database session."""
+    """Get synchronous database session (scripts/background tasks)."""
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Get async database session for request handlers."""
+    async with AsyncSessionLocal() as db:
+        yield db
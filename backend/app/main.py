@@ -3,68 +3,143 @@ Scio IT Helpdesk RAG Chatbot - FastAPI Backend
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
+import asyncio
+import logging
+import queue
 
-from app.config import get_settings
+from app.config import settings
 from app.database import init_db
 from app.models import HealthResponse
 from app.routers import chat, knowledge, finetune
 
-settings = get_settings()
+logger = logging.getLogger("scio")
+
+_log_listener = None
+
+
+def _configure_logging():
+    """Route app logging through a queue so emit never blocks on stdio.
+
+    Emitting a record just enqueues it; a background listener thread does
+    the blocking stream write, keeping stdout contention out of hot loops
+    like batched ingestion.
+    """
+    global _log_listener
+    if _log_listener is not None:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(
+        logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    )
+    log_queue = queue.Queue(-1)
+    _log_listener = QueueListener(log_queue, handler)
+    queue_handler = QueueHandler(log_queue)
+    level = logging.DEBUG if settings.debug else logging.INFO
+    # "app" covers the service/router module loggers, "scio" this module
+    for name in ("scio", "app"):
+        target = logging.getLogger(name)
+        target.addHandler(queue_handler)
+        target.setLevel(level)
+    _log_listener.start()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events."""
     # Startup
-    print("=" * 50)
-    print(f"  {settings.app_name} - {settings.app_description}")
-    print(f"  Version: {settings.app_version}")
-    print("=" * 50)
+    _configure_logging()
+    logger.info("%s - %s (version %s)",
+                settings.app_name, settings.app_description, settings.app_version)
     
     # Initialize database
-    print("Initializing database...")
+    logger.info("Initializing database...")
     init_db()
-    print("Database initialized!")
+    logger.info("Database initialized!")
     
-    # Pre-load services (optional - can be lazy loaded)
-    print("Pre-loading services...")
-    try:
-        from app.services.embeddings import get_embedding_service
-        from app.services.vectordb import get_vectordb_service
-        from app.services.llm import get_llm_service
-        
-        get_embedding_service()
-        get_vectordb_service()
-        get_llm_service()
-        print("Services loaded!")
-    except Exception as e:
-        print(f"Warning: Could not pre-load some services: {e}")
+    # Pre-load services (optional - can be lazy loaded) concurrently in
+    # worker threads so the model load and network handshakes overlap and
+    # don't block the event loop
+    logger.info("Pre-loading services...")
+    from app.services.embeddings import get_embedding_service
+    from app.services.vectordb import get_vectordb_service
+    from app.services.llm import get_llm_service
+
+    results = await asyncio.gather(
+        asyncio.to_thread(get_embedding_service),
+        asyncio.to_thread(get_vectordb_service),
+        asyncio.to_thread(get_llm_service),
+        return_exceptions=True
+    )
+    for loader, result in zip(
+        ("embedding", "vectordb", "llm"), results
+    ):
+        if isinstance(result, Exception):
+            logger.warning("Could not pre-load %s service: %s", loader, result)
+    logger.info("Services loaded!")
     
-    print("\nServer is ready!")
-    print(f"API docs available at: http://{settings.host}:{settings.port}/docs\n")
+    logger.info("Server is ready! API docs available at: http://%s:%s/docs",
+                settings.host, settings.port)
     
     yield
     
     # Shutdown
-    print("\nShutting down...")
+    logger.info("Shutting down...")
+    if _log_listener is not None:
+        _log_listener.stop()
 
 
 # Create FastAPI app
+# orjson serializes responses in Rust straight to bytes, skipping the
+# pure-Python json.dumps + UTF-8 re-encode on every payload
 app = FastAPI(
     title=settings.app_name,
     description=settings.app_description,
     version=settings.app_version,
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
-# CORS middleware
+# CORS middleware - explicit method/header lists let Starlette precompute
+# the preflight headers instead of rebuilding them per request
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # In production, specify allowed origins
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "PATCH", "DELETE"],
+    allow_headers=["content-type", "authorization"],
+    expose_headers=[],
+)
+
+class _GZipExceptStream:
+    """GZip middleware wrapper that bypasses the SSE streaming path.
+
+    The compressor buffers small writes, which would hold back individual
+    SSE token frames; everything else gets compressed as usual.
+    """
+
+    def __init__(self, app, exclude_paths=(), **kwargs):
+        self.app = app
+        self.gzip = GZipMiddleware(app, **kwargs)
+        self.exclude_paths = frozenset(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+        else:
+            await self.gzip(scope, receive, send)
+
+
+# Compress JSON-heavy payloads - conversation listings are full of
+# repeated keys and compress 5-10x
+app.add_middleware(
+    _GZipExceptStream,
+    exclude_paths={"/chat/stream"},
+    minimum_size=1024,
+    compresslevel=6
 )
 
 # Include routers
@@ -103,9 +178,23 @@ async def health_check():
 
 if __name__ == "__main__":
     import uvicorn
+
+    # uvloop + httptools (bundled with uvicorn[standard]) cut event-loop
+    # and HTTP-parsing overhead versus the stdlib implementations; fall
+    # back to uvicorn's auto-detection where they aren't available
+    # (e.g. uvloop on Windows)
+    try:
+        import uvloop  # noqa: F401
+        import httptools  # noqa: F401
+        loop_impl, http_impl = "uvloop", "httptools"
+    except ImportError:
+        loop_impl = http_impl = "auto"
+
     uvicorn.run(
         "app.main:app",
         host=settings.host,
         port=settings.port,
-        reload=settings.debug
+        reload=settings.debug,
+        loop=loop_impl,
+        http=http_impl
     )
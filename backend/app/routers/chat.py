@@ -1,28 +1,65 @@
 """
 Chat API Router
 """
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from datetime import datetime
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import delete, func, literal_column, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from functools import lru_cache
 from typing import Optional
-import uuid
-import json
-import ollama
+import asyncio
+import logging
+import orjson
 
-from app.database import get_db, ConversationDB, MessageDB
+from app.config import settings
+from app.database import (
+    get_async_db, generate_uuid, SessionLocal,
+    ConversationDB, MessageDB, MessageSourceDB
+)
 from app.models import (
     ChatRequest, ChatResponse, ChatMessage, MessageRole,
-    FeedbackRequest, FeedbackType, SourceDocument,
-    Conversation, ConversationDetail, ConversationListResponse
+    FeedbackRequest,
+    ConversationDetail, ConversationListResponse
 )
 from app.services.rag import get_rag_service
-from app.services.llm import get_llm_service
+from app.services.llm import get_llm_service, cached_ollama_list
 from app.services.gemini import get_gemini_service
 
+
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
 
+@lru_cache(maxsize=1024)
+def _generate_title_cached(normalized_message: str, model: Optional[str]) -> str:
+    """Generate a conversation title, memoized on the normalized message.
+
+    Helpdesk opening messages repeat a lot ("wifi not working"), so the
+    LLM round-trip is amortized across identical first messages.
+    """
+    return get_llm_service().generate_title(normalized_message, model=model)
+
+
+def _update_title(conversation_id: str, first_message: str, model: Optional[str]) -> None:
+    """Background task: generate an LLM title and persist it.
+
+    Runs after the response is sent, so the extra LLM round-trip never
+    sits on the first-turn critical path.
+    """
+    try:
+        title = _generate_title_cached(first_message.strip().lower()[:120], model)
+    except Exception:
+        return
+    with SessionLocal() as db:
+        db.execute(
+            update(ConversationDB)
+            .where(ConversationDB.id == conversation_id)
+            .values(title=title)
+        )
+        db.commit()
+
+
 @router.get("/models")
 async def list_available_models():
     """
@@ -38,9 +75,9 @@ async def list_available_models():
     ]
     available_models.extend(gemini_models)
     
-    # Add Ollama models
+    # Add Ollama models - TTL-cached list, fetched off the event loop
     try:
-        result = ollama.list()
+        result = await asyncio.to_thread(cached_ollama_list)
         models_list = result.models if hasattr(result, 'models') else result.get('models', [])
         for model in models_list:
             if hasattr(model, 'model'):
@@ -60,63 +97,65 @@ async def list_available_models():
                     "provider": "ollama"
                 })
     except Exception as e:
-        print(f"Ollama list error: {e}")
+        logger.warning("Ollama list error: %s", e)
     
     return {"models": available_models}
 
 
-@router.post("", response_model=ChatResponse)
+@router.post("", response_model=None, responses={200: {"model": ChatResponse}})
 async def send_message(
     request: ChatRequest,
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Send a message and get a RAG-powered response.
     """
     rag_service = get_rag_service()
-    llm_service = get_llm_service()
-    
+
     # Get or create conversation
     conversation_id = request.conversation_id
     conversation = None
     
     if conversation_id:
-        conversation = db.query(ConversationDB).filter(
-            ConversationDB.id == conversation_id
-        ).first()
-    
+        conversation = (await db.execute(
+            select(ConversationDB).where(ConversationDB.id == conversation_id)
+        )).scalars().first()
+
     if not conversation:
-        # Create new conversation
-        conversation_id = str(uuid.uuid4())
+        # Create new conversation (persisted with the messages below in a
+        # single transaction)
+        conversation_id = generate_uuid()
         conversation = ConversationDB(
             id=conversation_id,
             title="New Conversation"
         )
         db.add(conversation)
-        db.commit()
-    
-    # Get conversation history
-    history_messages = db.query(MessageDB).filter(
-        MessageDB.conversation_id == conversation_id
-    ).order_by(MessageDB.timestamp.asc()).all()
-    
+
+    # Get conversation history - only the two columns the prompt needs,
+    # skipping ORM hydration of sources_json and friends
+    history_rows = (await db.execute(
+        select(MessageDB.role, MessageDB.content)
+        .where(MessageDB.conversation_id == conversation_id)
+        .order_by(MessageDB.timestamp.asc(), literal_column("rowid"))
+    )).all()
+
     conversation_history = [
-        {"role": msg.role, "content": msg.content}
-        for msg in history_messages
+        {"role": role, "content": content}
+        for role, content in history_rows
     ]
-    
-    # Save user message
+
+    # User message (saved together with the assistant message below)
     user_message = MessageDB(
-        id=str(uuid.uuid4()),
+        id=generate_uuid(),
         conversation_id=conversation_id,
         role=MessageRole.USER.value,
         content=request.message
     )
-    db.add(user_message)
-    
+
     # Generate RAG response
     try:
-        response_text, sources, is_critical = rag_service.generate_response(
+        response_text, sources, is_critical = await rag_service.agenerate_response(
             query=request.message,
             conversation_history=conversation_history,
             model=request.model
@@ -124,28 +163,46 @@ async def send_message(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate response: {str(e)}")
     
-    # Save assistant message
-    assistant_message_id = str(uuid.uuid4())
+    # Save assistant message with normalized source rows
+    assistant_message_id = generate_uuid()
     assistant_message = MessageDB(
         id=assistant_message_id,
         conversation_id=conversation_id,
         role=MessageRole.ASSISTANT.value,
         content=response_text,
-        sources_json=json.dumps([s.model_dump() for s in sources]) if sources else None,
         is_critical=is_critical
     )
-    db.add(assistant_message)
-    
-    if len(history_messages) == 0:
-        try:
-            title = llm_service.generate_title(request.message, model=request.model)
-            conversation.title = title
-        except Exception:
-            conversation.title = request.message[:50] + "..." if len(request.message) > 50 else request.message
-    
-    conversation.updated_at = datetime.now()
-    db.commit()
+    if sources:
+        assistant_message.sources = [
+            MessageSourceDB(
+                content=s.content,
+                source=s.source,
+                metadata_json=orjson.dumps(s.metadata).decode() if s.metadata else None,
+                relevance_score=s.relevance_score
+            )
+            for s in sources
+        ]
+    db.add_all([user_message, assistant_message])
+
+    if len(history_rows) == 0:
+        if len(request.message) <= 50:
+            # Short first messages already make fine titles - skip the LLM
+            conversation.title = request.message
+        else:
+            # Truncation for immediate display; the LLM title replaces it
+            # after the response is sent
+            conversation.title = request.message[:50] + "..."
+            background_tasks.add_task(
+                _update_title, conversation_id, request.message, request.model
+            )
     
+    # DB-side timestamp; also bumps the row for conversation ordering
+    conversation.updated_at = func.now()
+
+    # Flush (no fsync) so generated defaults like the message timestamp are
+    # available, then commit everything in one transaction
+    await db.flush()
+
     # Build response
     chat_message = ChatMessage(
         id=assistant_message_id,
@@ -155,55 +212,117 @@ async def send_message(
         sources=sources,
         is_critical=is_critical
     )
-    
-    return ChatResponse(
-        message=chat_message,
-        conversation_id=conversation_id
-    )
+
+    await db.commit()
+
+    # Serialize straight through orjson - the payload was just built from
+    # trusted data, so FastAPI's outbound re-validation adds nothing
+    return ORJSONResponse({
+        "message": chat_message.model_dump(mode="json"),
+        "conversation_id": conversation_id
+    })
 
 
 @router.post("/stream")
 async def send_message_stream(
     request: ChatRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Send a message and get a streaming RAG response.
     """
     rag_service = get_rag_service()
     
-    # Get or create conversation
-    conversation_id = request.conversation_id or str(uuid.uuid4())
-    
-    conversation = db.query(ConversationDB).filter(
-        ConversationDB.id == conversation_id
-    ).first()
-    
+    # Get or create conversation - only hit the DB when the client actually
+    # supplied an id; a freshly generated UUID is a guaranteed miss
+    conversation_id = request.conversation_id or generate_uuid()
+
+    conversation = None
+    if request.conversation_id:
+        conversation = (await db.execute(
+            select(ConversationDB).where(ConversationDB.id == conversation_id)
+        )).scalars().first()
+
     if not conversation:
+        # Committed together with the messages at end of stream - the
+        # client only learns the conversation_id from the final frame, so
+        # nothing references the row before then
         conversation = ConversationDB(id=conversation_id)
         db.add(conversation)
-        db.commit()
-    
-    # Get history
-    history_messages = db.query(MessageDB).filter(
-        MessageDB.conversation_id == conversation_id
-    ).order_by(MessageDB.timestamp.asc()).all()
-    
+
+    # Get history - only the columns used for the prompt, capped at the
+    # most recent turns so long conversations don't delay the first token
+    history_rows = (await db.execute(
+        select(MessageDB.role, MessageDB.content)
+        .where(MessageDB.conversation_id == conversation_id)
+        .order_by(MessageDB.timestamp.desc(), literal_column("rowid").desc())
+        .limit(settings.max_history_turns)
+    )).all()[::-1]
+
     conversation_history = [
-        {"role": msg.role, "content": msg.content}
-        for msg in history_messages
+        {"role": role, "content": content}
+        for role, content in history_rows
     ]
     
+    is_new_conversation = len(history_rows) == 0
+
     async def generate():
         full_response = ""
-        for chunk in rag_service.generate_response_stream(
+        # Filled with sources/is_critical before the first chunk arrives
+        stream_info = {}
+        stream = rag_service.agenerate_response_stream(
             query=request.message,
-            conversation_history=conversation_history
-        ):
+            conversation_history=conversation_history,
+            result=stream_info
+        )
+        async for chunk in stream:
             full_response += chunk
-            yield f"data: {json.dumps({'content': chunk})}\n\n"
-        
-        yield f"data: {json.dumps({'done': True, 'conversation_id': conversation_id})}\n\n"
+            # orjson + bytes: runs once per LLM token, so skip stdlib json
+            # and Starlette's str -> bytes encode
+            yield b"data: " + orjson.dumps({"content": chunk}) + b"\n\n"
+
+        sources = stream_info.get("sources")
+        is_critical = stream_info.get("is_critical", False)
+
+        # Persist both turns in one transaction, same as send_message
+        user_message = MessageDB(
+            id=generate_uuid(),
+            conversation_id=conversation_id,
+            role=MessageRole.USER.value,
+            content=request.message
+        )
+        assistant_message = MessageDB(
+            id=generate_uuid(),
+            conversation_id=conversation_id,
+            role=MessageRole.ASSISTANT.value,
+            content=full_response,
+            is_critical=is_critical
+        )
+        if sources:
+            assistant_message.sources = [
+                MessageSourceDB(
+                    content=s.content,
+                    source=s.source,
+                    metadata_json=orjson.dumps(s.metadata).decode() if s.metadata else None,
+                    relevance_score=s.relevance_score
+                )
+                for s in sources
+            ]
+        db.add_all([user_message, assistant_message])
+
+        if is_new_conversation:
+            # Cheap title only - no LLM call while the client is waiting
+            # for the final SSE frame
+            conversation.title = (
+                request.message if len(request.message) <= 50
+                else request.message[:50] + "..."
+            )
+        conversation.updated_at = func.now()
+        await db.commit()
+
+        yield b"data: " + orjson.dumps(
+            {"done": True, "conversation_id": conversation_id}
+        ) + b"\n\n"
     
     return StreamingResponse(
         generate(),
@@ -214,43 +333,59 @@ async def send_message_stream(
 @router.post("/feedback")
 async def submit_feedback(
     request: FeedbackRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Submit feedback for a message.
     If feedback is thumbs_up, the Q&A pair is added to the knowledge base
     so the chatbot can learn from successful interactions.
     """
-    message = db.query(MessageDB).filter(
-        MessageDB.id == request.message_id
-    ).first()
-    
-    if not message:
+    # Single UPDATE round-trip instead of ORM load + mutate + save;
+    # RETURNING hands back the columns the learning path needs, so a hit
+    # never costs a second SELECT
+    message = (await db.execute(
+        update(MessageDB)
+        .where(MessageDB.id == request.message_id)
+        .values(feedback=request.feedback.value)
+        .returning(
+            MessageDB.conversation_id, MessageDB.timestamp,
+            MessageDB.content, MessageDB.role
+        )
+    )).first()
+
+    if message is None:
         raise HTTPException(status_code=404, detail="Message not found")
-    
-    message.feedback = request.feedback.value
-    db.commit()
-    
+
+    await db.commit()
+
     learned = False
-    
-    # If thumbs up, add Q&A pair to knowledge base for learning
-    if request.feedback.value == "thumbs_up":
-        # Get the previous user message (the question)
-        prev_messages = db.query(MessageDB).filter(
-            MessageDB.conversation_id == message.conversation_id,
-            MessageDB.timestamp < message.timestamp,
-            MessageDB.role == "user"
-        ).order_by(MessageDB.timestamp.desc()).first()
-        
-        if prev_messages:
-            question = prev_messages.content
-            answer = message.content
-            
+
+    # If thumbs up on an answer, add the Q&A pair to the knowledge base
+    # for learning. Only assistant rows qualify: rating a user message
+    # must not learn that message as its own answer.
+    if request.feedback.value == "thumbs_up" and message.role == "assistant":
+        # Get the previous user message (the question). The question is
+        # flushed together with its answer and can share the answer's
+        # timestamp even at fractional-second resolution, so compare
+        # with <= (the role filter keeps the answer row itself out) and
+        # tie-break on insertion order
+        prev_message = (await db.execute(
+            select(MessageDB.content)
+            .where(
+                MessageDB.conversation_id == message.conversation_id,
+                MessageDB.timestamp <= message.timestamp,
+                MessageDB.role == "user"
+            )
+            .order_by(MessageDB.timestamp.desc(), literal_column("rowid").desc())
+            .limit(1)
+        )).first()
+
+        if prev_message:
             # Add to knowledge base
-            learned = rag_service.add_learned_qa(
-                question=question,
-                answer=answer,
-                message_id=message.id
+            learned = get_rag_service().add_learned_qa(
+                question=prev_message.content,
+                answer=message.content,
+                message_id=request.message_id
             )
     
     return {
@@ -260,126 +395,186 @@ async def submit_feedback(
     }
 
 
-@router.get("/conversations", response_model=ConversationListResponse)
+@router.get("/conversations", response_model=None, responses={200: {"model": ConversationListResponse}})
 async def list_conversations(
     limit: int = 50,
     offset: int = 0,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     List all conversations with pinned first.
     """
-    total = db.query(ConversationDB).count()
-    
-    # Sort by pinned first, then by updated_at
-    conversations = db.query(ConversationDB).order_by(
-        ConversationDB.is_pinned.desc(),
-        ConversationDB.updated_at.desc()
-    ).offset(offset).limit(limit).all()
-    
-    result = []
-    for conv in conversations:
-        msg_count = db.query(MessageDB).filter(
-            MessageDB.conversation_id == conv.id
-        ).count()
-        
-        result.append(Conversation(
-            id=conv.id,
-            title=conv.title,
-            is_pinned=conv.is_pinned or False,
-            created_at=conv.created_at,
-            updated_at=conv.updated_at,
-            message_count=msg_count
-        ))
-    
-    return ConversationListResponse(conversations=result, total=total)
+    # Single aggregate query instead of one COUNT(*) per conversation,
+    # sorted by pinned first, then by updated_at. The window count rides
+    # along on every row, so the total needs no second query.
+    rows = (await db.execute(
+        select(
+            ConversationDB,
+            func.count(MessageDB.id).label("msg_count"),
+            func.count().over().label("total")
+        )
+        .outerjoin(MessageDB, MessageDB.conversation_id == ConversationDB.id)
+        .group_by(ConversationDB.id)
+        .order_by(
+            ConversationDB.is_pinned.desc(),
+            ConversationDB.updated_at.desc()
+        )
+        .offset(offset).limit(limit)
+    )).all()
+
+    if rows:
+        total = rows[0].total
+    else:
+        # Page past the end (or empty table) - fall back to the PK count
+        total = (await db.execute(select(func.count(ConversationDB.id)))).scalar()
+
+    # Plain dicts straight into orjson - no Pydantic construction or
+    # outbound re-validation for server-built rows
+    result = [
+        {
+            "id": conv.id,
+            "title": conv.title,
+            "is_pinned": conv.is_pinned or False,
+            "created_at": conv.created_at,
+            "updated_at": conv.updated_at,
+            "message_count": msg_count
+        }
+        for conv, msg_count, _ in rows
+    ]
+
+    return ORJSONResponse({"conversations": result, "total": total})
 
 
-@router.get("/conversations/{conversation_id}", response_model=ConversationDetail)
+@router.get("/conversations/{conversation_id}", response_model=None, responses={200: {"model": ConversationDetail}})
 async def get_conversation(
     conversation_id: str,
-    db: Session = Depends(get_db)
+    include_sources: bool = True,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get a conversation with all messages.
+
+    Pass include_sources=false to skip fetching and decoding source
+    documents entirely (e.g. for sidebar previews).
     """
-    conversation = db.query(ConversationDB).filter(
-        ConversationDB.id == conversation_id
-    ).first()
-    
+    conversation = (await db.execute(
+        select(ConversationDB).where(ConversationDB.id == conversation_id)
+    )).scalars().first()
+
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
-    
-    messages = db.query(MessageDB).filter(
-        MessageDB.conversation_id == conversation_id
-    ).order_by(MessageDB.timestamp.asc()).all()
-    
+
+    # Column-only fetches (lightweight Row tuples, no ORM instrumentation):
+    # one query for the messages, one join for all their source rows
+    messages = (await db.execute(
+        select(
+            MessageDB.id, MessageDB.role, MessageDB.content,
+            MessageDB.timestamp, MessageDB.feedback, MessageDB.is_critical,
+            MessageDB.sources_json
+        )
+        .where(MessageDB.conversation_id == conversation_id)
+        .order_by(MessageDB.timestamp.asc(), literal_column("rowid"))
+    )).all()
+
+    sources_by_message = {}
+    if include_sources:
+        source_rows = (await db.execute(
+            select(
+                MessageSourceDB.message_id, MessageSourceDB.content,
+                MessageSourceDB.source, MessageSourceDB.metadata_json,
+                MessageSourceDB.relevance_score
+            )
+            .join(MessageDB, MessageDB.id == MessageSourceDB.message_id)
+            .where(MessageDB.conversation_id == conversation_id)
+            .order_by(MessageSourceDB.id.asc())
+        )).all()
+        for row in source_rows:
+            sources_by_message.setdefault(row.message_id, []).append(row)
+
+    # Stored JSON goes through as orjson.Fragment - the pre-serialized
+    # bytes are spliced into the output without a parse/validate/re-dump
+    # round-trip per message
     chat_messages = []
     for msg in messages:
         sources = None
-        if msg.sources_json:
+        if msg.id in sources_by_message:
+            sources = [
+                {
+                    "content": s.content,
+                    "source": s.source,
+                    "metadata": orjson.Fragment(s.metadata_json) if s.metadata_json else {},
+                    "relevance_score": s.relevance_score
+                }
+                for s in sources_by_message[msg.id]
+            ]
+        elif include_sources and msg.sources_json:
+            # Legacy rows written before sources were normalized. Parse
+            # once to validate - a corrupt blob would otherwise make the
+            # final dumps raise and 500 the whole conversation - then
+            # splice the original bytes so they aren't re-serialized.
             try:
-                sources_data = json.loads(msg.sources_json)
-                sources = [SourceDocument(**s) for s in sources_data]
-            except Exception:
-                pass
-        
-        chat_messages.append(ChatMessage(
-            id=msg.id,
-            role=MessageRole(msg.role),
-            content=msg.content,
-            timestamp=msg.timestamp,
-            sources=sources,
-            feedback=FeedbackType(msg.feedback) if msg.feedback else None,
-            is_critical=msg.is_critical or False
-        ))
-    
-    return ConversationDetail(
-        id=conversation.id,
-        title=conversation.title,
-        created_at=conversation.created_at,
-        updated_at=conversation.updated_at,
-        messages=chat_messages
-    )
+                orjson.loads(msg.sources_json)
+            except orjson.JSONDecodeError:
+                sources = None
+            else:
+                sources = orjson.Fragment(msg.sources_json)
+
+        chat_messages.append({
+            "id": msg.id,
+            "role": msg.role,
+            "content": msg.content,
+            "timestamp": msg.timestamp,
+            "sources": sources,
+            "feedback": msg.feedback,
+            "is_critical": msg.is_critical or False
+        })
+
+    return ORJSONResponse({
+        "id": conversation.id,
+        "title": conversation.title,
+        "created_at": conversation.created_at,
+        "updated_at": conversation.updated_at,
+        "messages": chat_messages
+    })
 
 
 @router.delete("/conversations/{conversation_id}")
 async def delete_conversation(
     conversation_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Delete a conversation.
     """
-    conversation = db.query(ConversationDB).filter(
-        ConversationDB.id == conversation_id
-    ).first()
-    
-    if not conversation:
+    # Single DELETE; messages and sources go with it via ON DELETE CASCADE
+    result = await db.execute(
+        delete(ConversationDB).where(ConversationDB.id == conversation_id)
+    )
+
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Conversation not found")
-    
-    db.delete(conversation)
-    db.commit()
-    
+
+    await db.commit()
+
     return {"success": True, "message": "Conversation deleted"}
 
 
 @router.patch("/conversations/{conversation_id}/pin")
 async def toggle_pin_conversation(
     conversation_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Toggle pin status of a conversation.
     """
-    conversation = db.query(ConversationDB).filter(
-        ConversationDB.id == conversation_id
-    ).first()
-    
+    conversation = (await db.execute(
+        select(ConversationDB).where(ConversationDB.id == conversation_id)
+    )).scalars().first()
+
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
-    
+
     conversation.is_pinned = not (conversation.is_pinned or False)
-    db.commit()
+    await db.commit()
     
     return {"success": True, "is_pinned": conversation.is_pinned}
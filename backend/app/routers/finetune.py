@@ -5,8 +5,10 @@ Provides endpoints for creating and managing custom models.
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 from typing import Optional, List
+import asyncio
 
 from app.services.finetune import get_finetune_service
+from app.services.llm import cached_ollama_list
 
 
 router = APIRouter(prefix="/finetune", tags=["Fine-tuning"])
@@ -47,7 +49,10 @@ async def create_custom_model(request: CreateModelRequest):
     and optimized parameters.
     """
     service = get_finetune_service()
-    result = service.create_model(
+    # Model builds block for seconds to minutes - run off the event loop
+    # so chat requests keep flowing while the daemon works
+    result = await asyncio.to_thread(
+        service.create_model,
         model_name=request.name,
         base_model=request.base_model,
         custom_prompt=request.custom_prompt,
@@ -99,10 +104,9 @@ async def list_available_base_models():
     """
     List available base models that can be used for fine-tuning.
     """
-    import ollama
-    
     try:
-        result = ollama.list()
+        # TTL-cached list, fetched off the event loop
+        result = await asyncio.to_thread(cached_ollama_list)
         models_list = result.models if hasattr(result, 'models') else []
         
         base_models = []
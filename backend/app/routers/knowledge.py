@@ -1,18 +1,31 @@
 """
 Knowledge Base API Router
 """
-from fastapi import APIRouter, BackgroundTasks, HTTPException
+from fastapi import APIRouter, HTTPException
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Optional
+import asyncio
+import logging
 
 from app.models import IngestRequest, IngestResponse, KnowledgeStats
 from app.services.vectordb import get_vectordb_service
 from app.utils.data_loader import load_all_datasets
-from app.config import get_settings
+from app.config import settings
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/knowledge", tags=["Knowledge Base"])
 
-settings = get_settings()
+
+# Documents per add_documents call - bounds peak memory and keeps each
+# embedding batch a reasonable unit of pipelined work
+INGEST_CHUNK_SIZE = 256
+
+# Dedicated single-thread worker for ingestion: keeps the CPU-heavy
+# encode/upsert loop off both the event loop and Starlette's shared
+# request threadpool, and serializes concurrent ingest triggers
+_ingest_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest")
 
 # Track ingestion status
 ingestion_status = {
@@ -37,46 +50,51 @@ def run_ingestion(force_reingest: bool = False):
         
         # Clear existing data if force reingest
         if force_reingest:
-            print("Force reingest: Clearing existing data...")
+            logger.info("Force reingest: Clearing existing data...")
             vectordb.delete_all()
         
         # Load all datasets
-        print("Loading datasets...")
+        logger.info("Loading datasets...")
         documents = load_all_datasets()
         
         if not documents:
             raise Exception("No documents loaded from datasets")
-        
-        # Extract data for ChromaDB
-        doc_contents = [doc["content"] for doc in documents]
-        doc_metadatas = [doc["metadata"] for doc in documents]
-        doc_ids = [doc["id"] for doc in documents]
-        
-        # Add to vector database
-        print("Adding documents to ChromaDB...")
-        count = vectordb.add_documents(
-            documents=doc_contents,
-            metadatas=doc_metadatas,
-            ids=doc_ids
-        )
-        
+
+        # Add to vector database in fixed-size chunks, keeping two chunks
+        # in flight so embedding (torch releases the GIL) overlaps the
+        # previous chunk's ChromaDB upsert
+        logger.info("Adding documents to ChromaDB...")
+        count = 0
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            pending = None
+            for start in range(0, len(documents), INGEST_CHUNK_SIZE):
+                chunk = documents[start:start + INGEST_CHUNK_SIZE]
+                future = executor.submit(
+                    vectordb.add_documents,
+                    documents=[doc["content"] for doc in chunk],
+                    metadatas=[doc["metadata"] for doc in chunk],
+                    ids=[doc["id"] for doc in chunk]
+                )
+                if pending is not None:
+                    count += pending.result()
+                pending = future
+            if pending is not None:
+                count += pending.result()
+
         ingestion_status["documents_count"] = count
         ingestion_status["last_ingestion"] = datetime.now()
-        print(f"Ingestion complete: {count} documents added")
+        logger.info("Ingestion complete: %d documents added", count)
         
     except Exception as e:
         ingestion_status["last_error"] = str(e)
-        print(f"Ingestion failed: {e}")
+        logger.error("Ingestion failed: %s", e)
     
     finally:
         ingestion_status["in_progress"] = False
 
 
 @router.post("/ingest", response_model=IngestResponse)
-async def ingest_data(
-    request: IngestRequest,
-    background_tasks: BackgroundTasks
-):
+async def ingest_data(request: IngestRequest):
     """
     Trigger knowledge base ingestion from datasets.
     """
@@ -86,9 +104,9 @@ async def ingest_data(
             message="Ingestion already in progress",
             documents_processed=0
         )
-    
-    # Run ingestion in background
-    background_tasks.add_task(run_ingestion, request.force_reingest)
+
+    # Run ingestion on the dedicated worker thread
+    _ingest_executor.submit(run_ingestion, request.force_reingest)
     
     return IngestResponse(
         success=True,
@@ -109,8 +127,11 @@ async def ingest_data_sync(request: IngestRequest):
             documents_processed=0
         )
     
-    run_ingestion(request.force_reingest)
-    
+    # Same worker thread, but awaited so the response reflects the outcome
+    await asyncio.wrap_future(
+        _ingest_executor.submit(run_ingestion, request.force_reingest)
+    )
+
     if ingestion_status["last_error"]:
         return IngestResponse(
             success=False,
@@ -0,0 +1,265 @@
+"""
+Semantic Response Cache
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from functools import lru_cache
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Symmetric int8 quantization of unit-normalized embeddings: a dot of
+# two quantized vectors divided by 127^2 approximates their cosine
+_QUANT_SCALE = 1.0 / (127 * 127)
+
+
+class _ModelCache:
+    """Embeddings and values cached for one model, row-aligned."""
+
+    __slots__ = ("embeddings", "entries", "last_used")
+
+    def __init__(self):
+        self.embeddings: Optional[np.ndarray] = None  # (N, dim) int8-quantized unit vectors
+        self.entries: List[Tuple[float, Any]] = []  # (expires_at, value)
+        self.last_used: List[float] = []
+
+
+class SemanticCache:
+    """In-process semantic cache for generated RAG responses.
+
+    Keyed by (query embedding, model): a lookup is one normalized
+    matrix-vector product over that model's cached embeddings, and a
+    cosine similarity above the threshold short-circuits both retrieval
+    and LLM generation. Helpdesk users paraphrase the same handful of
+    questions constantly, so hits replace a vector search + full LLM
+    round-trip with a sub-millisecond dot product.
+
+    The 0.97 threshold keeps hits to true paraphrases; different models
+    never share entries since their answers differ in style and quality.
+
+    Embeddings are stored int8-quantized (4x less memory than float32,
+    and the lookup scan is memory-bandwidth-bound); for unit vectors the
+    quantization error is well below the 0.97 threshold's margin.
+
+    Entries are also written through to a small SQLite file so the cache
+    survives restarts: fresh rows are reloaded into memory at startup and
+    exact-key lookups fall back to disk on a memory miss.
+    """
+
+    _instance = None
+
+    # Disk rows are pruned every this many write-throughs so the table
+    # stays bounded without paying two DELETEs on every put
+    _PRUNE_EVERY = 64
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(
+        self,
+        similarity_threshold: float = 0.97,
+        max_entries: int = 2048,
+        ttl_seconds: float = 3600.0
+    ):
+        if getattr(self, "_initialized", False):
+            return
+        self._initialized = True
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._by_model: Dict[Optional[str], _ModelCache] = {}
+        # Guards the in-memory stores (embeddings/entries/last_used stay
+        # row-aligned) as well as the shared sqlite handle - get/put run
+        # from arbitrary worker threads
+        self._lock = threading.Lock()
+        self._db = None
+        self._writes_since_prune = 0
+        if settings.response_cache_path:
+            self._init_db(settings.response_cache_path)
+
+    def _init_db(self, path: str) -> None:
+        """Open (or create) the disk-backed cache and reload fresh rows."""
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "key BLOB PRIMARY KEY, model TEXT, embedding BLOB NOT NULL, "
+                "value BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._load_persisted()
+        except Exception as e:
+            logger.warning("Semantic cache persistence disabled: %s", e)
+            self._db = None
+
+    def _prune_disk(self) -> None:
+        """Drop expired rows, then cap the table at max_entries (newest kept).
+
+        Keeps the disk cache bounded on long-lived servers; callers hold
+        self._lock (or run before any concurrency exists).
+        """
+        cutoff = time.time() - self.ttl_seconds
+        self._db.execute(
+            "DELETE FROM response_cache WHERE created_at <= ?", (cutoff,)
+        )
+        self._db.execute(
+            "DELETE FROM response_cache WHERE key NOT IN ("
+            "SELECT key FROM response_cache ORDER BY created_at DESC LIMIT ?)",
+            (self.max_entries,)
+        )
+        self._db.commit()
+
+    def _load_persisted(self) -> None:
+        """Prune expired rows, then warm memory with the newest entries."""
+        self._prune_disk()
+        rows = self._db.execute(
+            "SELECT model, embedding, value, created_at FROM response_cache"
+            " ORDER BY created_at DESC LIMIT ?",
+            (self.max_entries,)
+        ).fetchall()
+        now_wall = time.time()
+        now_mono = time.monotonic()
+        for model, emb_blob, value_blob, created_at in rows:
+            vec = np.frombuffer(emb_blob, dtype=np.int8)
+            expires_at = now_mono + (created_at + self.ttl_seconds - now_wall)
+            self._memory_put(vec, pickle.loads(value_blob), model, expires_at)
+
+    @staticmethod
+    def _key(vec: np.ndarray, model: Optional[str]) -> bytes:
+        """Exact-match disk key for a quantized embedding and model."""
+        return hashlib.blake2b(
+            vec.tobytes() + (model or "").encode(), digest_size=16
+        ).digest()
+
+    @staticmethod
+    def _quantize(embedding: List[float]) -> np.ndarray:
+        """L2-normalize and symmetrically quantize a vector to int8."""
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            vec = vec / norm
+        return np.clip(np.rint(vec * 127), -127, 127).astype(np.int8)
+
+    @staticmethod
+    def _drop(store: _ModelCache, indices: List[int]) -> None:
+        """Remove the given row indices from a model store."""
+        keep = [i for i in range(len(store.entries)) if i not in set(indices)]
+        store.entries = [store.entries[i] for i in keep]
+        store.last_used = [store.last_used[i] for i in keep]
+        store.embeddings = store.embeddings[keep] if keep else None
+
+    def _evict_expired(self, store: _ModelCache) -> None:
+        now = time.monotonic()
+        expired = [
+            i for i, (expires_at, _) in enumerate(store.entries) if expires_at <= now
+        ]
+        if expired:
+            self._drop(store, expired)
+
+    def get(self, embedding: List[float], model: Optional[str] = None) -> Optional[Any]:
+        """Return the cached value for the nearest query above the threshold."""
+        query = self._quantize(embedding)
+        with self._lock:
+            store = self._by_model.get(model)
+            if store is not None:
+                self._evict_expired(store)
+                if store.embeddings is not None:
+                    # int32 accumulation: a 127^2-scaled dot overflows int16
+                    scores = (store.embeddings @ query.astype(np.int32)) * _QUANT_SCALE
+                    best = int(np.argmax(scores))
+                    if scores[best] >= self.similarity_threshold:
+                        store.last_used[best] = time.monotonic()
+                        return store.entries[best][1]
+        return self._disk_get(query, model)
+
+    def _disk_get(self, vec: np.ndarray, model: Optional[str]) -> Optional[Any]:
+        """Exact-key fallback to the disk cache on a memory miss."""
+        if self._db is None:
+            return None
+        try:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT value, created_at FROM response_cache WHERE key = ?",
+                    (self._key(vec, model),)
+                ).fetchone()
+        except Exception:
+            return None
+        if row is None:
+            return None
+        value_blob, created_at = row
+        remaining = created_at + self.ttl_seconds - time.time()
+        if remaining <= 0:
+            return None
+        value = pickle.loads(value_blob)
+        # Promote to memory so repeat hits stay sub-millisecond
+        self._memory_put(vec, value, model, time.monotonic() + remaining)
+        return value
+
+    def _memory_put(
+        self,
+        vec: np.ndarray,
+        value: Any,
+        model: Optional[str],
+        expires_at: Optional[float] = None
+    ) -> None:
+        with self._lock:
+            store = self._by_model.setdefault(model, _ModelCache())
+            row = vec[np.newaxis, :]
+            if store.embeddings is None:
+                store.embeddings = row
+            else:
+                store.embeddings = np.vstack([store.embeddings, row])
+            now = time.monotonic()
+            store.entries.append(
+                (expires_at if expires_at is not None else now + self.ttl_seconds, value)
+            )
+            store.last_used.append(now)
+            if len(store.entries) > self.max_entries:
+                # Evict the least-recently-used entry
+                self._drop(store, [int(np.argmin(store.last_used))])
+
+    def put(self, embedding: List[float], value: Any, model: Optional[str] = None) -> None:
+        """Cache a value under its query embedding for the given model."""
+        vec = self._quantize(embedding)
+        self._memory_put(vec, value, model)
+        if self._db is None:
+            return
+        try:
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?, ?, ?)",
+                    (
+                        self._key(vec, model),
+                        model,
+                        vec.tobytes(),
+                        pickle.dumps(value),
+                        time.time()
+                    )
+                )
+                self._db.commit()
+                self._writes_since_prune += 1
+                if self._writes_since_prune >= self._PRUNE_EVERY:
+                    self._writes_since_prune = 0
+                    self._prune_disk()
+        except Exception as e:
+            logger.warning("Semantic cache write-through failed: %s", e)
+
+
+@lru_cache()
+def get_semantic_cache() -> SemanticCache:
+    """Get cached semantic cache instance."""
+    return SemanticCache()
@@ -3,72 +3,151 @@ Sentence Transformer Embedding Service
 """
 from sentence_transformers import SentenceTransformer
 from typing import List
+import logging
 import numpy as np
+import torch
 from functools import lru_cache
 
-from app.config import get_settings
+from app.config import settings
+
+try:
+    # Optional quantized inference backend (pip install optimum[onnxruntime])
+    from optimum.onnxruntime import ORTModelForFeatureExtraction
+    from transformers import AutoTokenizer
+except ImportError:
+    ORTModelForFeatureExtraction = None
+    AutoTokenizer = None
+
+logger = logging.getLogger(__name__)
 
-settings = get_settings()
 
 
 class EmbeddingService:
-    """Service for generating text embeddings using Sentence Transformers."""
-    
+    """Service for generating text embeddings using Sentence Transformers.
+
+    If settings.embedding_onnx_path points at an ONNX export (typically
+    INT8-quantized via optimum) and onnxruntime is installed, inference
+    runs through ONNX Runtime instead of eager PyTorch - roughly 3-4x
+    faster for single-query encodes on CPU.
+    """
+
     _instance = None
     _model = None
-    
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
-    
+
     def __init__(self):
         if self._model is None:
-            print(f"Loading embedding model: {settings.embedding_model}")
-            self._model = SentenceTransformer(settings.embedding_model)
-            self.dimension = self._model.get_sentence_embedding_dimension()
-            print(f"Embedding dimension: {self.dimension}")
-    
+            self._use_onnx = bool(
+                settings.embedding_onnx_path and ORTModelForFeatureExtraction
+            )
+            if self._use_onnx:
+                logger.info("Loading ONNX embedding model: %s", settings.embedding_onnx_path)
+                self._tokenizer = AutoTokenizer.from_pretrained(settings.embedding_onnx_path)
+                self._model = ORTModelForFeatureExtraction.from_pretrained(
+                    settings.embedding_onnx_path,
+                    provider="CPUExecutionProvider"
+                )
+                self.dimension = self._model.config.hidden_size
+            else:
+                logger.info("Loading embedding model: %s", settings.embedding_model)
+                self._model = SentenceTransformer(settings.embedding_model)
+                if torch.cuda.is_available():
+                    # fp16 halves memory bandwidth and doubles tensor-core
+                    # throughput; CPU inference stays fp32 (no fast half path)
+                    self._model.half()
+                self.dimension = self._model.get_sentence_embedding_dimension()
+            logger.info("Embedding dimension: %s", self.dimension)
+
+    def _encode_onnx(self, texts: List[str]) -> np.ndarray:
+        """Mean-pooled, normalized embeddings via ONNX Runtime (all numpy)."""
+        inputs = self._tokenizer(
+            texts, padding=True, truncation=True, return_tensors="np"
+        )
+        hidden = self._model(**inputs).last_hidden_state
+        mask = inputs["attention_mask"][..., np.newaxis].astype(hidden.dtype)
+        embeddings = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return (embeddings / norms).astype(np.float32)
+
     def embed_text(self, text: str) -> List[float]:
         """
         Generate embedding for a single text.
-        
+
         Args:
             text: Input text to embed
-            
+
         Returns:
-            List of floats representing the embedding
+            List of floats representing the embedding (unit-normalized)
         """
-        embedding = self._model.encode(text, convert_to_numpy=True)
+        if self._use_onnx:
+            return self._encode_onnx([text])[0].tolist()
+        embedding = self._model.encode(
+            text, convert_to_numpy=True, normalize_embeddings=True
+        )
         return embedding.tolist()
-    
-    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
         """
         Generate embeddings for multiple texts.
-        
+
         Args:
             texts: List of input texts
-            
+
         Returns:
-            List of embeddings
+            Array of embeddings, shape (len(texts), dimension), unit-normalized
         """
-        embeddings = self._model.encode(texts, convert_to_numpy=True, show_progress_bar=True)
-        return embeddings.tolist()
-    
+        if self._use_onnx:
+            return np.vstack([
+                self._encode_onnx(texts[i:i + 64])
+                for i in range(0, len(texts), 64)
+            ])
+        # Return the ndarray as-is; .tolist() would box every float into a
+        # Python object, so conversion is deferred to whoever needs lists
+        return self._model.encode(
+            texts,
+            batch_size=64,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+
     def similarity(self, embedding1: List[float], embedding2: List[float]) -> float:
         """
         Calculate cosine similarity between two embeddings.
-        
+
         Args:
-            embedding1: First embedding
-            embedding2: Second embedding
-            
+            embedding1: First embedding (unit-normalized)
+            embedding2: Second embedding (unit-normalized)
+
         Returns:
             Cosine similarity score (0-1)
         """
-        vec1 = np.array(embedding1)
-        vec2 = np.array(embedding2)
-        return float(np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2)))
+        # Embeddings come out of encode() pre-normalized, so the dot
+        # product already is the cosine; ndarrays go straight to BLAS,
+        # lists are converted once
+        if not isinstance(embedding1, np.ndarray):
+            embedding1 = np.asarray(embedding1, dtype=np.float32)
+        if not isinstance(embedding2, np.ndarray):
+            embedding2 = np.asarray(embedding2, dtype=np.float32)
+        return float(np.dot(embedding1, embedding2))
+
+    def similarity_batch(self, query_vec: np.ndarray, doc_vecs: np.ndarray) -> np.ndarray:
+        """
+        Calculate cosine similarity of one query against many documents.
+
+        Args:
+            query_vec: Query embedding, shape (dimension,), unit-normalized
+            doc_vecs: Document embeddings, shape (n, dimension), unit-normalized
+
+        Returns:
+            Array of similarity scores, shape (n,)
+        """
+        # One BLAS matrix-vector product instead of n Python-level calls
+        return np.einsum('d,nd->n', query_vec, doc_vecs)
 
 
 @lru_cache()
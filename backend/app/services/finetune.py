@@ -3,52 +3,23 @@ Fine-tuning Service for Scio IT Helpdesk
 Creates custom Ollama models using Modelfile approach.
 """
 import os
-import subprocess
 import json
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 import ollama
 
-from app.config import get_settings
+from sqlalchemy import delete, select
 
-settings = get_settings()
+from app.config import settings
+from app.database import SessionLocal, CustomModelDB
+from app.services.llm import cached_ollama_list, invalidate_ollama_list_cache
 
 
-class FineTuneService:
-    """Service for creating and managing custom Ollama models."""
-    
-    def __init__(self):
-        self.models_dir = Path(__file__).parent.parent.parent / "models"
-        self.models_dir.mkdir(exist_ok=True)
-        self.default_modelfile = self.models_dir / "Modelfile.helpdesk"
-    
-    def get_modelfile_content(
-        self, 
-        base_model: str = "llama3.2:3b", 
-        custom_prompt: Optional[str] = None,
-        temperature: float = 0.7,
-        top_p: float = 0.9,
-        num_ctx: int = 4096
-    ) -> str:
-        """Generate Modelfile content with custom parameters."""
-        system_prompt = custom_prompt or self._get_default_system_prompt()
-        
-        return f'''FROM {base_model}
-
-# IT Helpdesk specialized model parameters
-PARAMETER temperature {temperature}
-PARAMETER top_p {top_p}
-PARAMETER top_k 40
-PARAMETER num_ctx {num_ctx}
 
-# System prompt for IT Helpdesk assistant
-SYSTEM """{system_prompt}"""
-'''
-    
-    def _get_default_system_prompt(self) -> str:
-        """Get default IT Helpdesk system prompt."""
-        return """You are SCIO, an expert IT Helpdesk Assistant specialized in technical support.
+# Default IT Helpdesk system prompt (module constant - built once)
+DEFAULT_SYSTEM_PROMPT = """You are SCIO, an expert IT Helpdesk Assistant specialized in technical support.
 
 ## Your Expertise:
 - Computer hardware troubleshooting and maintenance
@@ -73,7 +44,91 @@ SYSTEM """{system_prompt}"""
 - When unsure, recommend seeking professional IT support
 
 You are helpful, accurate, and focused on solving IT problems efficiently."""
-    
+
+
+@lru_cache(maxsize=32)
+def _modelfile(
+    base_model: str,
+    custom_prompt: Optional[str],
+    temperature: float,
+    top_p: float,
+    num_ctx: int
+) -> str:
+    """Render Modelfile content, memoized per parameter tuple."""
+    system_prompt = custom_prompt or DEFAULT_SYSTEM_PROMPT
+
+    return f'''FROM {base_model}
+
+# IT Helpdesk specialized model parameters
+PARAMETER temperature {temperature}
+PARAMETER top_p {top_p}
+PARAMETER top_k 40
+PARAMETER num_ctx {num_ctx}
+
+# System prompt for IT Helpdesk assistant
+SYSTEM """{system_prompt}"""
+'''
+
+
+class FineTuneService:
+    """Service for creating and managing custom Ollama models."""
+
+    def __init__(self):
+        self.models_dir = Path(__file__).parent.parent.parent / "models"
+        self.models_dir.mkdir(exist_ok=True)
+        self.default_modelfile = self.models_dir / "Modelfile.helpdesk"
+        self._backfill_registry()
+
+    def _backfill_registry(self) -> None:
+        """Register Modelfiles created before the registry existed.
+
+        Older versions only left a Modelfile.<name> on disk; one scan at
+        startup merges those models in, so listing stays a pure SELECT
+        and pre-registry models (whatever their name) keep showing up.
+        """
+        try:
+            modelfiles = {
+                path.name.split(".", 1)[1]: path
+                for path in self.models_dir.glob("Modelfile.*")
+            }
+            if not modelfiles:
+                return
+            with SessionLocal() as db:
+                registered = {
+                    name for (name,) in db.execute(select(CustomModelDB.name)).all()
+                }
+                for name, path in modelfiles.items():
+                    if name in registered:
+                        continue
+                    base_model = "unknown"
+                    try:
+                        for line in path.read_text(encoding="utf-8").splitlines():
+                            if line.startswith("FROM "):
+                                base_model = line[5:].strip()
+                                break
+                    except OSError:
+                        pass
+                    db.add(CustomModelDB(
+                        name=name,
+                        base_model=base_model,
+                        modelfile_path=str(path)
+                    ))
+                db.commit()
+        except Exception:
+            # Listing still works off the registry rows that do exist
+            pass
+
+    def get_modelfile_content(
+        self,
+        base_model: str = "llama3.2:3b",
+        custom_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        top_p: float = 0.9,
+        num_ctx: int = 4096
+    ) -> str:
+        """Generate Modelfile content with custom parameters."""
+        return _modelfile(base_model, custom_prompt, temperature, top_p, num_ctx)
+
     def create_model(
         self,
         model_name: str,
@@ -107,23 +162,31 @@ You are helpful, accurate, and focused on solving IT problems efficiently."""
                 num_ctx
             )
             
-            # Save Modelfile
+            # Save Modelfile (kept for audit/debugging)
             modelfile_path = self.models_dir / f"Modelfile.{model_name}"
             with open(modelfile_path, "w", encoding="utf-8") as f:
                 f.write(modelfile_content)
-            
-            # Create model using Ollama CLI subprocess
-            # This is more reliable across different ollama-python versions
-            result = subprocess.run(
-                ["ollama", "create", model_name, "-f", str(modelfile_path)],
-                capture_output=True,
-                text=True,
-                timeout=300  # 5 minute timeout
+
+            # Create model through the Python client - no fork/exec and no
+            # re-read of the Modelfile from disk, and the client reuses
+            # its HTTP connection to the daemon
+            ollama.create(
+                model=model_name,
+                modelfile=modelfile_content,
+                stream=False
             )
-            
-            if result.returncode != 0:
-                raise Exception(f"Ollama create failed: {result.stderr}")
-            
+
+            invalidate_ollama_list_cache()
+
+            # Register the model so listing is a SELECT, not a stat walk
+            with SessionLocal() as db:
+                db.merge(CustomModelDB(
+                    name=model_name,
+                    base_model=base_model,
+                    modelfile_path=str(modelfile_path)
+                ))
+                db.commit()
+
             return {
                 "success": True,
                 "model_name": model_name,
@@ -143,17 +206,23 @@ You are helpful, accurate, and focused on solving IT problems efficiently."""
     def list_custom_models(self) -> List[Dict[str, Any]]:
         """List all custom models created by this service."""
         custom_models = []
-        
+
         try:
-            result = ollama.list()
+            # One indexed SELECT instead of a filesystem stat per model
+            with SessionLocal() as db:
+                registered = {
+                    name for (name,) in db.execute(select(CustomModelDB.name)).all()
+                }
+
+            result = cached_ollama_list()
             models_list = result.models if hasattr(result, 'models') else []
-            
+
             for model in models_list:
                 model_name = model.model if hasattr(model, 'model') else str(model)
-                # Check if it's a custom model (has corresponding Modelfile)
-                modelfile_path = self.models_dir / f"Modelfile.{model_name.split(':')[0]}"
-                
-                if modelfile_path.exists() or model_name.startswith("scio"):
+                base_name = model_name.split(':')[0]
+
+                # "scio" prefix covers models created before the registry
+                if model_name in registered or base_name in registered or model_name.startswith("scio"):
                     custom_models.append({
                         "name": model_name,
                         "size": getattr(model, 'size', 0),
@@ -175,7 +244,15 @@ You are helpful, accurate, and focused on solving IT problems efficiently."""
             modelfile_path = self.models_dir / f"Modelfile.{model_name.split(':')[0]}"
             if modelfile_path.exists():
                 modelfile_path.unlink()
-            
+
+            with SessionLocal() as db:
+                db.execute(delete(CustomModelDB).where(
+                    CustomModelDB.name.in_([model_name, model_name.split(':')[0]])
+                ))
+                db.commit()
+
+            invalidate_ollama_list_cache()
+
             return {
                 "success": True,
                 "message": f"Model '{model_name}' deleted successfully"
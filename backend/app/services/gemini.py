@@ -4,10 +4,14 @@ Gemini LLM Service
 import google.generativeai as genai
 from typing import Generator, Optional
 from functools import lru_cache
+import logging
+import time
 
-from app.config import get_settings, SYSTEM_PROMPT
+from app.config import settings, SYSTEM_STATIC, SYSTEM_CONTEXT_TEMPLATE
+from app.services.history import trim_history
+
+logger = logging.getLogger(__name__)
 
-settings = get_settings()
 
 
 class GeminiService:
@@ -19,15 +23,64 @@ class GeminiService:
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
-    
+
+    # Streaming chunk coalescing: buffer until either threshold is hit
+    # instead of paying per-chunk send overhead for every fragment
+    STREAM_FLUSH_CHARS = 64
+    STREAM_FLUSH_SECS = 0.05
+
     def __init__(self):
         if not hasattr(self, '_initialized'):
             self.api_key = settings.gemini_api_key
             self.model_name = settings.gemini_model
             genai.configure(api_key=self.api_key)
             self.model = genai.GenerativeModel(self.model_name)
+            # Constructed models keyed by name - GenerativeModel setup
+            # parses config and builds a client, no need to redo it per
+            # request (setdefault keeps this safe under the GIL)
+            self._model_cache = {self.model_name: self.model}
+            # Static prompt head, computed once: everything up to the
+            # spot where the retrieved context is spliced in
+            head, tail = SYSTEM_CONTEXT_TEMPLATE.split("{context}")
+            self._prompt_head = f"{SYSTEM_STATIC}\n\n{head}"
+            self._prompt_tail = f"{tail}\n\n"
             self._initialized = True
     
+    def _build_prompt(
+        self,
+        user_message: str,
+        context: str,
+        conversation_history: Optional[list] = None
+    ) -> str:
+        """Assemble the full prompt shared by sync and async paths.
+
+        The static instructions form a stable prefix (Gemini's implicit
+        prompt caching keys on prefixes); the retrieved context follows.
+        Assembled as a list-join so each request allocates one string
+        instead of re-concatenating the large prefix per piece.
+        """
+        parts = [self._prompt_head, context, self._prompt_tail]
+
+        # Add conversation history, trimmed to the prompt-token budget
+        if conversation_history:
+            for msg in trim_history(conversation_history):
+                role = "User" if msg["role"] == "user" else "Assistant"
+                parts.append(f"{role}: {msg['content']}\n\n")
+
+        # Add current user message
+        parts.append(f"User: {user_message}\n\nAssistant:")
+        return "".join(parts)
+
+    def _resolve_model(self, model: Optional[str]):
+        """Pick the (cached) GenerativeModel for an optional model override."""
+        use_model = model if model and "gemini" in model else self.model_name
+        gen_model = self._model_cache.get(use_model)
+        if gen_model is None:
+            gen_model = self._model_cache.setdefault(
+                use_model, genai.GenerativeModel(use_model)
+            )
+        return gen_model
+
     def generate(
         self,
         user_message: str,
@@ -37,37 +90,20 @@ class GeminiService:
     ) -> str:
         """
         Generate a response using Gemini.
-        
+
         Args:
             user_message: User's question
             context: Retrieved context from knowledge base
             conversation_history: Previous messages in conversation
-            
+
         Returns:
             LLM response text
         """
-        # Build system prompt with context
-        system_message = SYSTEM_PROMPT.format(context=context)
-        
-        # Build conversation as a single prompt
-        full_prompt = f"{system_message}\n\n"
-        
-        # Add conversation history if provided
-        if conversation_history:
-            for msg in conversation_history[-6:]:  # Last 6 messages for context
-                role = "User" if msg["role"] == "user" else "Assistant"
-                full_prompt += f"{role}: {msg['content']}\n\n"
-        
-        # Add current user message
-        full_prompt += f"User: {user_message}\n\nAssistant:"
-        
+        full_prompt = self._build_prompt(user_message, context, conversation_history)
+
         try:
-            use_model = model if model and "gemini" in model else self.model_name
-            if use_model != self.model_name:
-                gen_model = genai.GenerativeModel(use_model)
-            else:
-                gen_model = self.model
-                
+            gen_model = self._resolve_model(model)
+
             response = gen_model.generate_content(
                 full_prompt,
                 generation_config=genai.types.GenerationConfig(
@@ -78,9 +114,46 @@ class GeminiService:
             )
             return response.text
         except Exception as e:
-            print(f"Gemini error: {e}")
+            logger.error("Gemini error: %s", e)
             raise Exception(f"Failed to generate response: {str(e)}")
-    
+
+    async def aiogenerate(
+        self,
+        user_message: str,
+        context: str,
+        conversation_history: Optional[list] = None,
+        model: Optional[str] = None
+    ) -> str:
+        """
+        Generate a response using Gemini (async API).
+
+        Args:
+            user_message: User's question
+            context: Retrieved context from knowledge base
+            conversation_history: Previous messages in conversation
+
+        Returns:
+            LLM response text
+        """
+        full_prompt = self._build_prompt(user_message, context, conversation_history)
+
+        try:
+            gen_model = self._resolve_model(model)
+
+            response = await gen_model.generate_content_async(
+                full_prompt,
+                generation_config=genai.types.GenerationConfig(
+                    temperature=0.7,
+                    top_p=0.9,
+                    max_output_tokens=1024,
+                )
+            )
+            return response.text
+        except Exception as e:
+            logger.error("Gemini error: %s", e)
+            raise Exception(f"Failed to generate response: {str(e)}")
+
+
     def generate_stream(
         self,
         user_message: str,
@@ -99,24 +172,11 @@ class GeminiService:
         Yields:
             Response chunks
         """
-        system_message = SYSTEM_PROMPT.format(context=context)
-        
-        full_prompt = f"{system_message}\n\n"
-        
-        if conversation_history:
-            for msg in conversation_history[-6:]:
-                role = "User" if msg["role"] == "user" else "Assistant"
-                full_prompt += f"{role}: {msg['content']}\n\n"
-        
-        full_prompt += f"User: {user_message}\n\nAssistant:"
-        
+        full_prompt = self._build_prompt(user_message, context, conversation_history)
+
         try:
-            use_model = model if model and "gemini" in model else self.model_name
-            if use_model != self.model_name:
-                gen_model = genai.GenerativeModel(use_model)
-            else:
-                gen_model = self.model
-                
+            gen_model = self._resolve_model(model)
+
             response = gen_model.generate_content(
                 full_prompt,
                 generation_config=genai.types.GenerationConfig(
@@ -126,14 +186,81 @@ class GeminiService:
                 ),
                 stream=True
             )
-            
+
+            buf = []
+            buf_len = 0
+            last_flush = time.monotonic()
             for chunk in response:
                 if chunk.text:
-                    yield chunk.text
+                    buf.append(chunk.text)
+                    buf_len += len(chunk.text)
+                    now = time.monotonic()
+                    if (
+                        buf_len >= self.STREAM_FLUSH_CHARS
+                        or now - last_flush >= self.STREAM_FLUSH_SECS
+                    ):
+                        yield "".join(buf)
+                        buf, buf_len, last_flush = [], 0, now
+            if buf:
+                yield "".join(buf)
         except Exception as e:
-            print(f"Gemini streaming error: {e}")
+            logger.error("Gemini streaming error: %s", e)
             yield f"Error: Failed to generate response - {str(e)}"
-    
+
+    async def aiogenerate_stream(
+        self,
+        user_message: str,
+        context: str,
+        conversation_history: Optional[list] = None,
+        model: Optional[str] = None
+    ):
+        """
+        Generate a streaming response using Gemini (async API).
+
+        Args:
+            user_message: User's question
+            context: Retrieved context from knowledge base
+            conversation_history: Previous messages
+
+        Yields:
+            Response chunks
+        """
+        full_prompt = self._build_prompt(user_message, context, conversation_history)
+
+        try:
+            gen_model = self._resolve_model(model)
+
+            response = await gen_model.generate_content_async(
+                full_prompt,
+                generation_config=genai.types.GenerationConfig(
+                    temperature=0.7,
+                    top_p=0.9,
+                    max_output_tokens=1024,
+                ),
+                stream=True
+            )
+
+            buf = []
+            buf_len = 0
+            last_flush = time.monotonic()
+            async for chunk in response:
+                if chunk.text:
+                    buf.append(chunk.text)
+                    buf_len += len(chunk.text)
+                    now = time.monotonic()
+                    if (
+                        buf_len >= self.STREAM_FLUSH_CHARS
+                        or now - last_flush >= self.STREAM_FLUSH_SECS
+                    ):
+                        yield "".join(buf)
+                        buf, buf_len, last_flush = [], 0, now
+            if buf:
+                yield "".join(buf)
+        except Exception as e:
+            logger.error("Gemini streaming error: %s", e)
+            yield f"Error: Failed to generate response - {str(e)}"
+
+
     def generate_title(self, first_message: str, model: Optional[str] = None) -> str:
         """
         Generate a conversation title from the first message.
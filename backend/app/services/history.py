@@ -0,0 +1,51 @@
+"""
+Conversation-history trimming shared by the LLM services
+"""
+from typing import Dict, List
+
+from app.config import settings
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 chars/token for English-like text).
+
+    Deliberately avoids a real tokenizer: prefill cost only needs to be
+    bounded, not counted exactly, and len() keeps this O(1) per message.
+    """
+    return len(text) // 4 + 1
+
+
+def trim_history(
+    history: List[Dict[str, str]],
+    budget: int = None
+) -> List[Dict[str, str]]:
+    """Keep the most recent messages that fit a token budget.
+
+    Walks the history backwards (newest first) and stops once the budget
+    is exhausted, so long sessions stop inflating prompt length - prefill
+    time is linear in prompt tokens.
+
+    Args:
+        history: Conversation messages with "content" keys
+        budget: Token budget; defaults to settings.max_history_tokens
+
+    Returns:
+        The trimmed history, oldest first
+    """
+    if not history:
+        return history
+
+    if budget is None:
+        budget = settings.max_history_tokens
+
+    keep = []
+    used = 0
+    for msg in reversed(history):
+        used += estimate_tokens(msg["content"])
+        if used > budget and keep:
+            break
+        keep.append(msg)
+        if used > budget:
+            break
+    keep.reverse()
+    return keep
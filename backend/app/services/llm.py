@@ -4,10 +4,109 @@ Ollama LLM Service
 import ollama
 from typing import Generator, Optional
 from functools import lru_cache
+import asyncio
+import logging
+import time
 
-from app.config import get_settings, SYSTEM_PROMPT
+from app.config import settings, SYSTEM_STATIC, SYSTEM_CONTEXT_TEMPLATE
+from app.services.history import trim_history
 
-settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+# Short-TTL memo for ollama.list(): the model inventory rarely changes,
+# but dashboard polling hits the model-listing endpoints constantly and
+# each call is a blocking HTTP round-trip to the Ollama daemon
+_OLLAMA_LIST_TTL = 30.0
+_ollama_list_cache = {"result": None, "at": 0.0}
+
+# The static system message never changes, so build it once and reuse
+# the dict across requests (the client only reads it). The context
+# template is split so splicing skips format-spec parsing per call.
+_STATIC_MESSAGE = {"role": "system", "content": SYSTEM_STATIC}
+_CONTEXT_HEAD, _CONTEXT_TAIL = SYSTEM_CONTEXT_TEMPLATE.split("{context}")
+
+
+def cached_ollama_list():
+    """Return ollama.list(), memoized for a short TTL."""
+    now = time.monotonic()
+    if (
+        _ollama_list_cache["result"] is None
+        or now - _ollama_list_cache["at"] > _OLLAMA_LIST_TTL
+    ):
+        _ollama_list_cache["result"] = ollama.list()
+        _ollama_list_cache["at"] = now
+    return _ollama_list_cache["result"]
+
+
+def invalidate_ollama_list_cache():
+    """Drop the cached model list (call after creating/deleting models)."""
+    _ollama_list_cache["result"] = None
+
+
+class _RequestCollector:
+    """Coalesces concurrent non-streaming chat calls into small batches.
+
+    Ollama's HTTP API takes one conversation per request, so "batching"
+    means collecting the calls that arrive within a short window and
+    firing them together over the shared AsyncClient: with
+    OLLAMA_NUM_PARALLEL > 1 the daemon decodes them in one forward-pass
+    batch instead of queueing them serially.
+    """
+
+    def __init__(self, client, max_batch: int = 8, max_delay: float = 0.01):
+        self._client = client
+        self._max_batch = max_batch
+        self._max_delay = max_delay
+        self._queue = None  # created lazily on the running loop
+        self._worker = None
+        self._inflight = set()  # strong refs to dispatched tasks
+
+    async def submit(self, **chat_kwargs):
+        """Queue one chat call and wait for its response."""
+        loop = asyncio.get_running_loop()
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+        future = loop.create_future()
+        await self._queue.put((chat_kwargs, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self._max_delay
+            while len(batch) < self._max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(
+                        await asyncio.wait_for(self._queue.get(), timeout)
+                    )
+                except asyncio.TimeoutError:
+                    break
+
+            # Fire every call in the batch as its own task and go back
+            # to collecting immediately: each future resolves as its own
+            # call completes, so a slow generation neither holds back the
+            # rest of its batch nor delays dispatch of later arrivals
+            for kwargs, future in batch:
+                task = loop.create_task(self._dispatch(kwargs, future))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, chat_kwargs, future):
+        """Run one chat call and resolve its future."""
+        try:
+            result = await self._client.chat(**chat_kwargs)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(result)
 
 
 class LLMService:
@@ -20,12 +119,62 @@ class LLMService:
             cls._instance = super().__new__(cls)
         return cls._instance
     
+    # Shared generation parameters for all chat calls
+    GENERATION_OPTIONS = {
+        "temperature": 0.7,
+        "top_p": 0.9,
+        "num_predict": 1024,
+    }
+
+    # Streaming chunk coalescing: yielding every token pays per-chunk
+    # serialization and ASGI send overhead, so buffer until either
+    # threshold is hit before passing a chunk up the stack
+    STREAM_FLUSH_CHARS = 64
+    STREAM_FLUSH_SECS = 0.05
+
     def __init__(self):
         self.model = settings.ollama_model
         self.host = settings.ollama_host
-        # Set the host for ollama client
-        ollama.Client(host=self.host)
-    
+        # Shared sync client: reusing one instance keeps the underlying
+        # httpx connection pool alive across calls instead of paying a
+        # TCP handshake per request (the module-level ollama.chat also
+        # ignores the configured host)
+        self._client = ollama.Client(host=self.host)
+        # Async client for request handlers - awaiting the chat call
+        # suspends instead of pinning the event loop
+        self._aclient = ollama.AsyncClient(host=self.host)
+        # Collector that coalesces concurrent non-streaming calls
+        self._collector = _RequestCollector(self._aclient)
+
+    def _build_messages(
+        self,
+        user_message: str,
+        context: str,
+        conversation_history: Optional[list] = None
+    ) -> list:
+        """Assemble the chat message list shared by sync and async paths.
+
+        The static instructions go first so the backend's prompt-prefix
+        cache hits on every request; only the context message changes.
+        """
+        messages = [
+            _STATIC_MESSAGE,
+            {"role": "system", "content": f"{_CONTEXT_HEAD}{context}{_CONTEXT_TAIL}"},
+        ]
+
+        # Add conversation history, trimmed to the prompt-token budget
+        if conversation_history:
+            for msg in trim_history(conversation_history):
+                messages.append({
+                    "role": msg["role"],
+                    "content": msg["content"]
+                })
+
+        # Add current user message
+        messages.append({"role": "user", "content": user_message})
+        return messages
+
+
     def generate(
         self,
         user_message: str,
@@ -44,39 +193,53 @@ class LLMService:
         Returns:
             LLM response text
         """
-        # Build system prompt with context
-        system_message = SYSTEM_PROMPT.format(context=context)
-        
-        # Build messages list
-        messages = [{"role": "system", "content": system_message}]
-        
-        # Add conversation history if provided
-        if conversation_history:
-            for msg in conversation_history[-6:]:  # Last 6 messages for context
-                messages.append({
-                    "role": msg["role"],
-                    "content": msg["content"]
-                })
-        
-        # Add current user message
-        messages.append({"role": "user", "content": user_message})
-        
+        messages = self._build_messages(user_message, context, conversation_history)
+
         try:
             use_model = model or self.model
-            response = ollama.chat(
+            response = self._client.chat(
                 model=use_model,
                 messages=messages,
-                options={
-                    "temperature": 0.7,
-                    "top_p": 0.9,
-                    "num_predict": 1024,
-                }
+                options=self.GENERATION_OPTIONS
             )
             return response["message"]["content"]
         except Exception as e:
-            print(f"Ollama error: {e}")
+            logger.error("Ollama error: %s", e)
             raise Exception(f"Failed to generate response: {str(e)}")
-    
+
+    async def aiogenerate(
+        self,
+        user_message: str,
+        context: str,
+        conversation_history: Optional[list] = None,
+        model: Optional[str] = None
+    ) -> str:
+        """
+        Generate a response using the LLM (async client).
+
+        Args:
+            user_message: User's question
+            context: Retrieved context from knowledge base
+            conversation_history: Previous messages in conversation
+
+        Returns:
+            LLM response text
+        """
+        messages = self._build_messages(user_message, context, conversation_history)
+
+        try:
+            use_model = model or self.model
+            response = await self._collector.submit(
+                model=use_model,
+                messages=messages,
+                options=self.GENERATION_OPTIONS
+            )
+            return response["message"]["content"]
+        except Exception as e:
+            logger.error("Ollama error: %s", e)
+            raise Exception(f"Failed to generate response: {str(e)}")
+
+
     def generate_stream(
         self,
         user_message: str,
@@ -95,39 +258,89 @@ class LLMService:
         Yields:
             Response chunks
         """
-        system_message = SYSTEM_PROMPT.format(context=context)
-        
-        messages = [{"role": "system", "content": system_message}]
-        
-        if conversation_history:
-            for msg in conversation_history[-6:]:
-                messages.append({
-                    "role": msg["role"],
-                    "content": msg["content"]
-                })
-        
-        messages.append({"role": "user", "content": user_message})
-        
+        messages = self._build_messages(user_message, context, conversation_history)
+
         try:
             use_model = model or self.model
-            stream = ollama.chat(
+            stream = self._client.chat(
                 model=use_model,
                 messages=messages,
                 stream=True,
-                options={
-                    "temperature": 0.7,
-                    "top_p": 0.9,
-                    "num_predict": 1024,
-                }
+                options=self.GENERATION_OPTIONS
             )
-            
+
+            buf = []
+            buf_len = 0
+            last_flush = time.monotonic()
             for chunk in stream:
                 if chunk and "message" in chunk and "content" in chunk["message"]:
-                    yield chunk["message"]["content"]
+                    content = chunk["message"]["content"]
+                    buf.append(content)
+                    buf_len += len(content)
+                    now = time.monotonic()
+                    if (
+                        buf_len >= self.STREAM_FLUSH_CHARS
+                        or now - last_flush >= self.STREAM_FLUSH_SECS
+                    ):
+                        yield "".join(buf)
+                        buf, buf_len, last_flush = [], 0, now
+            if buf:
+                yield "".join(buf)
         except Exception as e:
-            print(f"Ollama streaming error: {e}")
+            logger.error("Ollama streaming error: %s", e)
             yield f"Error: Failed to generate response - {str(e)}"
-    
+
+    async def aiogenerate_stream(
+        self,
+        user_message: str,
+        context: str,
+        conversation_history: Optional[list] = None,
+        model: Optional[str] = None
+    ):
+        """
+        Generate a streaming response using the LLM (async client).
+
+        Args:
+            user_message: User's question
+            context: Retrieved context from knowledge base
+            conversation_history: Previous messages
+
+        Yields:
+            Response chunks
+        """
+        messages = self._build_messages(user_message, context, conversation_history)
+
+        try:
+            use_model = model or self.model
+            stream = await self._aclient.chat(
+                model=use_model,
+                messages=messages,
+                stream=True,
+                options=self.GENERATION_OPTIONS
+            )
+
+            buf = []
+            buf_len = 0
+            last_flush = time.monotonic()
+            async for chunk in stream:
+                if chunk and "message" in chunk and "content" in chunk["message"]:
+                    content = chunk["message"]["content"]
+                    buf.append(content)
+                    buf_len += len(content)
+                    now = time.monotonic()
+                    if (
+                        buf_len >= self.STREAM_FLUSH_CHARS
+                        or now - last_flush >= self.STREAM_FLUSH_SECS
+                    ):
+                        yield "".join(buf)
+                        buf, buf_len, last_flush = [], 0, now
+            if buf:
+                yield "".join(buf)
+        except Exception as e:
+            logger.error("Ollama streaming error: %s", e)
+            yield f"Error: Failed to generate response - {str(e)}"
+
+
     def generate_title(self, first_message: str, model: Optional[str] = None) -> str:
         """
         Generate a conversation title from the first message.
@@ -140,7 +353,7 @@ class LLMService:
         """
         try:
             use_model = model or self.model
-            response = ollama.chat(
+            response = self._client.chat(
                 model=use_model,
                 messages=[
                     {
@@ -161,7 +374,7 @@ class LLMService:
     def is_connected(self) -> bool:
         """Check if Ollama is connected."""
         try:
-            ollama.list()
+            self._client.list()
             return True
         except Exception:
             return False
@@ -3,14 +3,46 @@ RAG (Retrieval-Augmented Generation) Service
 """
 from typing import List, Dict, Any, Optional, Tuple
 from functools import lru_cache
+import asyncio
+import logging
 
-from app.config import get_settings, CRITICAL_KEYWORDS
+from app.config import settings, CRITICAL_REGEX
+from app.services.cache import get_semantic_cache
+from app.services.embeddings import get_embedding_service
 from app.services.vectordb import get_vectordb_service
 from app.services.llm import get_llm_service
 from app.services.gemini import get_gemini_service
 from app.models import SourceDocument
 
-settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+# Bound once so the hot path is a single C call per message
+_critical_search = CRITICAL_REGEX.search
+
+# Prepended (non-streaming) or yielded first (streaming) when a message
+# trips the critical-keyword matcher
+_CRITICAL_WARNING = (
+    "⚠️ **CRITICAL ISSUE DETECTED**: This appears to be a serious issue. "
+    "Please escalate immediately to the IT Security team or your supervisor."
+)
+
+# Greetings/acknowledgements (English and Indonesian) that retrieve
+# nothing useful - short-circuit these past embedding + vector search
+_TRIVIAL_QUERIES = frozenset({
+    "hi", "hello", "hey", "thanks", "thank you", "ok", "okay", "bye",
+    "goodbye", "good morning", "good afternoon", "good evening",
+    "halo", "hai", "terima kasih", "makasih", "oke", "sip",
+    "selamat pagi", "selamat siang", "selamat sore", "selamat malam",
+})
+
+_TRIVIAL_CONTEXT = "No retrieval needed - the user sent a greeting or acknowledgement."
+
+
+def _is_trivial(query: str) -> bool:
+    """True for micro-messages where retrieval is pure overhead."""
+    q = query.lower().strip(" .,!?")
+    return q in _TRIVIAL_QUERIES
 
 
 class RAGService:
@@ -27,6 +59,8 @@ class RAGService:
         self.vectordb = get_vectordb_service()
         self.llm = get_llm_service()
         self.gemini = get_gemini_service()
+        self.cache = get_semantic_cache()
+        self.embeddings = get_embedding_service()
         self.top_k = settings.top_k_results
     
     def detect_critical_issue(self, text: str) -> bool:
@@ -39,33 +73,76 @@ class RAGService:
         Returns:
             True if critical keywords found
         """
-        text_lower = text.lower()
-        return any(keyword in text_lower for keyword in CRITICAL_KEYWORDS)
+        return _critical_search(text) is not None
     
     def retrieve(
         self,
         query: str,
-        top_k: Optional[int] = None
+        top_k: Optional[int] = None,
+        query_embedding: Optional[List[float]] = None
     ) -> Tuple[str, List[SourceDocument]]:
         """
         Retrieve relevant documents for a query.
-        
+
         Args:
             query: User query
             top_k: Number of documents to retrieve
-            
+            query_embedding: Precomputed query embedding, if the caller
+                already has one (e.g. from the semantic-cache lookup)
+
         Returns:
             Tuple of (combined context string, list of source documents)
         """
         k = top_k or self.top_k
-        
+
         # Search vector database
-        results = self.vectordb.search(query, top_k=k)
-        
-        # Build context and source documents
+        results = self.vectordb.search(query, top_k=k, query_embedding=query_embedding)
+
+        return self._build_context(results)
+
+    def retrieve_many(
+        self,
+        queries: List[str],
+        top_k: Optional[int] = None
+    ) -> Tuple[str, List[SourceDocument]]:
+        """
+        Retrieve documents for several query variants in one batched call.
+
+        Useful for multi-query expansion: all variants are embedded in one
+        batch and searched in a single ChromaDB RPC, then the result sets
+        are deduplicated by document id with the best score winning.
+
+        Args:
+            queries: Query variants
+            top_k: Number of documents per query
+
+        Returns:
+            Tuple of (combined context string, list of source documents)
+        """
+        k = top_k or self.top_k
+
+        best: Dict[Any, Dict[str, Any]] = {}
+        for results in self.vectordb.search_many(queries, top_k=k):
+            for result in results:
+                doc_key = result.get("id") or result["content"]
+                prev = best.get(doc_key)
+                if prev is None or result["relevance_score"] > prev["relevance_score"]:
+                    best[doc_key] = result
+
+        merged = sorted(
+            best.values(), key=lambda r: r["relevance_score"], reverse=True
+        )[:k]
+
+        return self._build_context(merged)
+
+    def _build_context(
+        self,
+        results: List[Dict[str, Any]]
+    ) -> Tuple[str, List[SourceDocument]]:
+        """Build the prompt context block and source list from results."""
         context_parts = []
         sources = []
-        
+
         for i, result in enumerate(results):
             content = result["content"]
             metadata = result["metadata"]
@@ -94,24 +171,45 @@ class RAGService:
         self,
         query: str,
         conversation_history: Optional[List[Dict[str, str]]] = None,
-        model: Optional[str] = None
+        model: Optional[str] = None,
+        use_cache: bool = True
     ) -> Tuple[str, List[SourceDocument], bool]:
         """
         Generate a RAG response for a query.
-        
+
         Args:
             query: User query
             conversation_history: Previous conversation messages
-            
+            use_cache: Pass False to bypass the semantic response cache
+                (neither read nor written), e.g. for evaluation runs
+
         Returns:
             Tuple of (response text, source documents, is_critical)
         """
         # Check for critical issues
         is_critical = self.detect_critical_issue(query)
-        
-        # Retrieve relevant context
-        context, sources = self.retrieve(query)
-        
+
+        # Greetings and acknowledgements skip embedding, cache and
+        # retrieval entirely - straight to generation with empty context
+        trivial = _is_trivial(query)
+
+        # Semantic cache lookup - only for opening questions, where the
+        # answer doesn't depend on earlier turns. A hit skips both the
+        # vector search and the LLM call.
+        query_embedding = None
+        if use_cache and not trivial and not conversation_history:
+            query_embedding = self.embeddings.embed_text(query)
+            cached = self.cache.get(query_embedding, model=model)
+            if cached is not None:
+                return cached
+
+        # Retrieve relevant context, reusing the cache-lookup embedding
+        # so the query is encoded at most once per request
+        if trivial:
+            context, sources = _TRIVIAL_CONTEXT, []
+        else:
+            context, sources = self.retrieve(query, query_embedding=query_embedding)
+
         # Generate response - use Gemini if model contains 'gemini'
         if model and 'gemini' in model:
             response = self.gemini.generate(
@@ -128,13 +226,161 @@ class RAGService:
                 model=model
             )
         
-        # Add critical warning if needed
+        # Add critical warning if needed - one join, no intermediate copies
         if is_critical:
-            critical_warning = "\n\n⚠️ **CRITICAL ISSUE DETECTED**: This appears to be a serious issue. Please escalate immediately to the IT Security team or your supervisor."
-            response = critical_warning + "\n\n" + response
-        
+            response = "".join(("\n\n", _CRITICAL_WARNING, "\n\n", response))
+
+        if query_embedding is not None:
+            self.cache.put(query_embedding, (response, sources, is_critical), model=model)
+
         return response, sources, is_critical
-    
+
+    async def agenerate_response(
+        self,
+        query: str,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        model: Optional[str] = None,
+        use_cache: bool = True
+    ) -> Tuple[str, List[SourceDocument], bool]:
+        """
+        Generate a RAG response for a query (async).
+
+        Embedding and retrieval run in worker threads and the LLM call
+        uses the async clients, so concurrent requests overlap their wait
+        time instead of serializing on the event loop.
+
+        Args:
+            query: User query
+            conversation_history: Previous conversation messages
+            use_cache: Pass False to bypass the semantic response cache
+                (neither read nor written), e.g. for evaluation runs
+
+        Returns:
+            Tuple of (response text, source documents, is_critical)
+        """
+        # Check for critical issues
+        is_critical = self.detect_critical_issue(query)
+
+        # Greetings and acknowledgements skip embedding, cache and
+        # retrieval entirely - straight to generation with empty context
+        trivial = _is_trivial(query)
+
+        # Start retrieval speculatively so it overlaps the cache lookup
+        # below; on the common miss path this takes the whole cache-check
+        # embedding off the critical path
+        retrieve_task = None
+        if not trivial:
+            retrieve_task = asyncio.create_task(
+                asyncio.to_thread(self.retrieve, query)
+            )
+
+        # Semantic cache lookup - only for opening questions, where the
+        # answer doesn't depend on earlier turns
+        query_embedding = None
+        if use_cache and not trivial and not conversation_history:
+            query_embedding = await asyncio.to_thread(
+                self.embeddings.embed_text, query
+            )
+            # Worker thread: a miss falls through to pickle + sqlite I/O,
+            # which must not run on the event loop
+            cached = await asyncio.to_thread(
+                self.cache.get, query_embedding, model=model
+            )
+            if cached is not None:
+                retrieve_task.cancel()
+                return cached
+
+        # Retrieve relevant context
+        if trivial:
+            context, sources = _TRIVIAL_CONTEXT, []
+        else:
+            context, sources = await retrieve_task
+
+        # Generate response - use Gemini if model contains 'gemini'
+        if model and 'gemini' in model:
+            response = await self.gemini.aiogenerate(
+                user_message=query,
+                context=context,
+                conversation_history=conversation_history,
+                model=model
+            )
+        else:
+            response = await self.llm.aiogenerate(
+                user_message=query,
+                context=context,
+                conversation_history=conversation_history,
+                model=model
+            )
+
+        # Add critical warning if needed - one join, no intermediate copies
+        if is_critical:
+            response = "".join(("\n\n", _CRITICAL_WARNING, "\n\n", response))
+
+        if query_embedding is not None:
+            # Write-through does pickle + sqlite work - off the loop
+            await asyncio.to_thread(
+                self.cache.put, query_embedding,
+                (response, sources, is_critical), model=model
+            )
+
+        return response, sources, is_critical
+
+    async def agenerate_response_stream(
+        self,
+        query: str,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        model: Optional[str] = None,
+        result: Optional[dict] = None
+    ):
+        """
+        Generate a streaming RAG response (async).
+
+        Args:
+            query: User query
+            conversation_history: Previous messages
+            result: Optional dict that is filled with "sources" and
+                "is_critical" before the first chunk is yielded (async
+                generators cannot return values)
+
+        Yields:
+            Response chunks
+        """
+        # Check for critical issues
+        is_critical = self.detect_critical_issue(query)
+
+        # Retrieve context in a worker thread (skipped for greetings)
+        if _is_trivial(query):
+            context, sources = _TRIVIAL_CONTEXT, []
+        else:
+            context, sources = await asyncio.to_thread(self.retrieve, query)
+
+        if result is not None:
+            result["sources"] = sources
+            result["is_critical"] = is_critical
+
+        # Yield critical warning first if needed
+        if is_critical:
+            yield _CRITICAL_WARNING + "\n\n"
+
+        # Stream response - use Gemini if model contains 'gemini'
+        if model and 'gemini' in model:
+            stream = self.gemini.aiogenerate_stream(
+                user_message=query,
+                context=context,
+                conversation_history=conversation_history,
+                model=model
+            )
+        else:
+            stream = self.llm.aiogenerate_stream(
+                user_message=query,
+                context=context,
+                conversation_history=conversation_history,
+                model=model
+            )
+
+        async for chunk in stream:
+            yield chunk
+
     def add_learned_qa(
         self,
         question: str,
@@ -177,11 +423,11 @@ Answer: {answer}"""
                 ids=[doc_id]
             )
             
-            print(f"✓ Learned Q&A pair added to knowledge base (ID: {doc_id})")
+            logger.info("Learned Q&A pair added to knowledge base (ID: %s)", doc_id)
             return added > 0
-            
+
         except Exception as e:
-            print(f"✗ Failed to add learned Q&A: {e}")
+            logger.error("Failed to add learned Q&A: %s", e)
             return False
     
     def generate_response_stream(
@@ -202,13 +448,16 @@ Answer: {answer}"""
         """
         # Check for critical issues
         is_critical = self.detect_critical_issue(query)
-        
-        # Retrieve context
-        context, sources = self.retrieve(query)
+
+        # Retrieve context (skipped for greetings)
+        if _is_trivial(query):
+            context, sources = _TRIVIAL_CONTEXT, []
+        else:
+            context, sources = self.retrieve(query)
         
         # Yield critical warning first if needed
         if is_critical:
-            yield "⚠️ **CRITICAL ISSUE DETECTED**: This appears to be a serious issue. Please escalate immediately to the IT Security team or your supervisor.\n\n"
+            yield _CRITICAL_WARNING + "\n\n"
         
         # Stream response
         for chunk in self.llm.generate_stream(
@@ -2,14 +2,18 @@
 ChromaDB Vector Database Service
 """
 import chromadb
+import numpy as np
 from chromadb.config import Settings as ChromaSettings
 from typing import List, Optional, Dict, Any
 from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+import logging
 
-from app.config import get_settings
+from app.config import settings
 from app.services.embeddings import get_embedding_service
 
-settings = get_settings()
+logger = logging.getLogger(__name__)
+
 
 
 class VectorDBService:
@@ -25,34 +29,35 @@ class VectorDBService:
         return cls._instance
     
     def __init__(self):
+        # Bound once - skips the lru_cache wrapper call on every search
+        self._embedder = get_embedding_service()
         if self._client is None:
             self._init_client()
     
     def _init_client(self):
         """Initialize ChromaDB client."""
         try:
-            print("Connecting to ChromaDB Cloud...")
+            logger.info("Connecting to ChromaDB Cloud...")
             self._client = chromadb.CloudClient(
                 api_key=settings.chromadb_api_key,
                 tenant=settings.chromadb_tenant,
                 database=settings.chromadb_database
             )
             self._get_or_create_collection()
-            print("ChromaDB connected successfully!")
+            logger.info("ChromaDB connected successfully!")
         except Exception as e:
-            print(f"Failed to connect to ChromaDB Cloud: {e}")
-            print("Falling back to local ChromaDB...")
+            logger.warning("Failed to connect to ChromaDB Cloud: %s", e)
+            logger.info("Falling back to local ChromaDB...")
             # Fallback to local persistent storage
             self._client = chromadb.PersistentClient(path="./data/chromadb")
             self._get_or_create_collection()
-            print("Local ChromaDB initialized!")
+            logger.info("Local ChromaDB initialized!")
     
     def _get_or_create_collection(self):
         """Get or create the knowledge base collection."""
-        embedding_service = get_embedding_service()
         self._collection = self._client.get_or_create_collection(
             name=settings.chromadb_collection,
-            metadata={"dimension": embedding_service.dimension}
+            metadata={"dimension": self._embedder.dimension}
         )
     
     def add_documents(
@@ -74,75 +79,132 @@ class VectorDBService:
         """
         if not documents:
             return 0
-        
-        embedding_service = get_embedding_service()
-        embeddings = embedding_service.embed_texts(documents)
-        
-        # ChromaDB has a batch limit, so we process in chunks
+
+        # ChromaDB has a batch limit, so we process in chunks. Embedding
+        # and upserting are pipelined: while batch i travels over the
+        # network in a worker thread, batch i+1 is embedded here, so the
+        # wall-clock cost is max(embed, upsert) instead of their sum.
         batch_size = 100
         total_added = 0
-        
-        for i in range(0, len(documents), batch_size):
-            batch_docs = documents[i:i + batch_size]
-            batch_embeddings = embeddings[i:i + batch_size]
-            batch_metadatas = metadatas[i:i + batch_size]
-            batch_ids = ids[i:i + batch_size]
-            
-            self._collection.upsert(
-                documents=batch_docs,
-                embeddings=batch_embeddings,
-                metadatas=batch_metadatas,
-                ids=batch_ids
-            )
-            total_added += len(batch_docs)
-            print(f"Added batch: {total_added}/{len(documents)} documents")
-        
+
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            pending = None
+            for i in range(0, len(documents), batch_size):
+                batch_docs = documents[i:i + batch_size]
+                batch_embeddings = self._embedder.embed_texts(batch_docs).tolist()
+
+                if pending is not None:
+                    pending.result()
+                pending = pool.submit(
+                    self._collection.upsert,
+                    documents=batch_docs,
+                    embeddings=batch_embeddings,
+                    metadatas=metadatas[i:i + batch_size],
+                    ids=ids[i:i + batch_size]
+                )
+                total_added += len(batch_docs)
+                logger.info("Added batch: %d/%d documents", total_added, len(documents))
+            if pending is not None:
+                pending.result()
+
         return total_added
     
     def search(
         self,
         query: str,
         top_k: int = 5,
-        filter_metadata: Optional[Dict[str, Any]] = None
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        query_embedding: Optional[List[float]] = None
     ) -> List[Dict[str, Any]]:
         """
         Search for similar documents.
-        
+
         Args:
             query: Search query text
             top_k: Number of results to return
             filter_metadata: Optional metadata filter
-            
+            query_embedding: Precomputed embedding for query; callers
+                that already embedded the query pass it to skip the
+                duplicate encoder pass
+
         Returns:
             List of search results with document, metadata, and score
         """
-        embedding_service = get_embedding_service()
-        query_embedding = embedding_service.embed_text(query)
-        
+        if query_embedding is None:
+            query_embedding = self._embedder.embed_text(query)
+
         results = self._collection.query(
             query_embeddings=[query_embedding],
             n_results=top_k,
             where=filter_metadata,
             include=["documents", "metadatas", "distances"]
         )
-        
-        # Format results
-        formatted_results = []
-        if results and results["documents"] and results["documents"][0]:
-            for i, doc in enumerate(results["documents"][0]):
-                distance = results["distances"][0][i] if results["distances"] else 0.0
-                # Convert L2 distance to similarity score (0-1 range)
-                # Using 1/(1+distance) for proper normalization
-                relevance_score = 1 / (1 + distance)
-                formatted_results.append({
-                    "content": doc,
-                    "metadata": results["metadatas"][0][i] if results["metadatas"] else {},
-                    "distance": distance,
-                    "relevance_score": relevance_score,
-                    "source": results["metadatas"][0][i].get("source", "unknown") if results["metadatas"] else "unknown"
-                })
-        
-        return formatted_results
+
+        return self._format_query_results(results, 0)
+
+    def search_many(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        filter_metadata: Optional[Dict[str, Any]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Search for similar documents for several queries at once.
+
+        One batched embedding pass and a single ChromaDB RPC instead of
+        one round-trip per query.
+
+        Args:
+            queries: Search query texts
+            top_k: Number of results per query
+            filter_metadata: Optional metadata filter
+
+        Returns:
+            One result list (as from search()) per query, in order
+        """
+        query_embeddings = self._embedder.embed_texts(queries).tolist()
+
+        results = self._collection.query(
+            query_embeddings=query_embeddings,
+            n_results=top_k,
+            where=filter_metadata,
+            include=["documents", "metadatas", "distances"]
+        )
+
+        return [
+            self._format_query_results(results, i) for i in range(len(queries))
+        ]
+
+    @staticmethod
+    def _format_query_results(results: Dict[str, Any], index: int) -> List[Dict[str, Any]]:
+        """Format one query's slice of a ChromaDB query() response."""
+        if not results or not results["documents"] or not results["documents"][index]:
+            return []
+
+        docs = results["documents"][index]
+        metas = results["metadatas"][index] if results["metadatas"] else [{}] * len(docs)
+        ids = results["ids"][index] if results.get("ids") else [None] * len(docs)
+        if results["distances"]:
+            distances = results["distances"][index]
+            # Convert L2 distance to similarity score (0-1 range) in one
+            # vectorized pass: 1/(1+distance) for proper normalization
+            scores = (1.0 / (1.0 + np.asarray(distances))).tolist()
+        else:
+            distances = [0.0] * len(docs)
+            scores = [1.0] * len(docs)
+
+        return [
+            {
+                "id": doc_id,
+                "content": doc,
+                "metadata": meta,
+                "distance": distance,
+                "relevance_score": score,
+                "source": meta.get("source", "unknown")
+            }
+            for doc_id, doc, meta, distance, score
+            in zip(ids, docs, metas, distances, scores)
+        ]
     
     def get_stats(self) -> Dict[str, Any]:
         """Get collection statistics."""
@@ -158,7 +220,7 @@ class VectorDBService:
         all_data = self._collection.get()
         if all_data and all_data["ids"]:
             self._collection.delete(ids=all_data["ids"])
-            print(f"Deleted {len(all_data['ids'])} documents")
+            logger.info("Deleted %d documents", len(all_data["ids"]))
     
     def is_connected(self) -> bool:
         """Check if ChromaDB is connected."""
@@ -3,10 +3,17 @@ Text Splitter Utilities
 """
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from typing import List, Dict, Any
+from functools import lru_cache
 
-from app.config import get_settings
+from app.config import settings
+
+try:
+    # Optional Rust-backed splitter (pip install semantic-text-splitter):
+    # native chunking instead of pure-Python recursive substring scans
+    from semantic_text_splitter import TextSplitter as RustTextSplitter
+except ImportError:
+    RustTextSplitter = None
 
-settings = get_settings()
 
 
 def create_text_splitter(
@@ -15,22 +22,40 @@ def create_text_splitter(
 ) -> RecursiveCharacterTextSplitter:
     """
     Create a text splitter with specified parameters.
-    
+
     Args:
         chunk_size: Maximum chunk size
         chunk_overlap: Overlap between chunks
-        
+
     Returns:
         Configured text splitter
     """
+    return _cached_splitter(
+        chunk_size or settings.chunk_size,
+        chunk_overlap or settings.chunk_overlap
+    )
+
+
+# Splitters are stateless between calls, so memoize per (size, overlap)
+# pair - ingest otherwise constructs one per document
+@lru_cache(maxsize=8)
+def _cached_splitter(
+    chunk_size: int,
+    chunk_overlap: int
+) -> RecursiveCharacterTextSplitter:
     return RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size or settings.chunk_size,
-        chunk_overlap=chunk_overlap or settings.chunk_overlap,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
         length_function=len,
         separators=["\n\n", "\n", ". ", ", ", " ", ""]
     )
 
 
+@lru_cache(maxsize=8)
+def _cached_rust_splitter(chunk_size: int, chunk_overlap: int):
+    return RustTextSplitter(chunk_size, overlap=chunk_overlap)
+
+
 def split_text(
     text: str,
     metadata: Dict[str, Any] = None,
@@ -49,21 +74,25 @@ def split_text(
     Returns:
         List of dicts with 'content' and 'metadata' keys
     """
-    splitter = create_text_splitter(chunk_size, chunk_overlap)
-    chunks = splitter.split_text(text)
+    size = chunk_size or settings.chunk_size
+    overlap = chunk_overlap or settings.chunk_overlap
+
+    if RustTextSplitter is not None:
+        chunks = _cached_rust_splitter(size, overlap).chunks(text)
+    else:
+        chunks = _cached_splitter(size, overlap).split_text(text)
     
-    result = []
-    for i, chunk in enumerate(chunks):
-        chunk_metadata = (metadata or {}).copy()
-        chunk_metadata["chunk_index"] = i
-        chunk_metadata["total_chunks"] = len(chunks)
-        
-        result.append({
+    # Build each chunk's metadata in one dict display: a single sized
+    # allocation per chunk instead of copy() plus two resizing setitems
+    base = metadata or {}
+    total = len(chunks)
+    return [
+        {
             "content": chunk,
-            "metadata": chunk_metadata
-        })
-    
-    return result
+            "metadata": {**base, "chunk_index": i, "total_chunks": total}
+        }
+        for i, chunk in enumerate(chunks)
+    ]
 
 
 def split_documents(
@@ -14,14 +14,36 @@ Options:
 import sys
 import os
 import argparse
+import queue
+import threading
+from itertools import islice
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.utils.data_loader import load_all_datasets
+from app.utils.data_loader import iter_all_datasets
 from app.services.vectordb import get_vectordb_service
 from app.config import get_settings
 
+# Documents shipped to add_documents per batch - keeps peak memory at
+# O(batch) and lets embedding overlap with the remaining file loading
+BATCH_SIZE = 256
+
+
+def _produce_batches(first_batch, doc_stream, batches):
+    """Loader thread: push fixed-size batches, then a None sentinel.
+
+    The bounded queue gives backpressure - loading (PDF extraction
+    releases the GIL in PyMuPDF) overlaps with embedding/upserting in
+    the main thread, so ingest wall time approaches
+    max(load, embed) instead of their sum.
+    """
+    batch = first_batch
+    while batch:
+        batches.put(batch)
+        batch = list(islice(doc_stream, BATCH_SIZE))
+    batches.put(None)
+
 
 def main():
     parser = argparse.ArgumentParser(description="Ingest data into Scio knowledge base")
@@ -40,51 +62,62 @@ def main():
     print(f"Dry run: {args.dry_run}")
     print()
     
-    # Load documents
+    # Stream documents in fixed-size batches instead of materializing
+    # the whole corpus up front
     print("Loading datasets...")
-    documents = load_all_datasets()
-    
-    if not documents:
+    doc_stream = iter_all_datasets()
+    batch = list(islice(doc_stream, BATCH_SIZE))
+
+    if not batch:
         print("ERROR: No documents loaded!")
         return 1
-    
-    print(f"\nTotal documents to ingest: {len(documents)}")
-    
+
     # Show sample
     print("\nSample documents:")
-    for i, doc in enumerate(documents[:3]):
+    for i, doc in enumerate(batch[:3]):
         print(f"\n  [{i+1}] Source: {doc['metadata'].get('source', 'Unknown')}")
         print(f"      Category: {doc['metadata'].get('category', 'Unknown')}")
         print(f"      Content preview: {doc['content'][:100]}...")
-    
+
     if args.dry_run:
+        total = len(batch) + sum(1 for _ in doc_stream)
+        print(f"\nTotal documents to ingest: {total}")
         print("\n[DRY RUN] No data was ingested.")
         return 0
-    
+
     # Get vector DB service
     print("\n" + "-" * 60)
     vectordb = get_vectordb_service()
-    
+
     # Check current stats
     stats = vectordb.get_stats()
     print(f"Current documents in DB: {stats['total_documents']}")
-    
+
     # Clear if force
     if args.force:
         print("\nClearing existing data...")
         vectordb.delete_all()
-    
-    # Ingest documents
+
+    # Ingest documents batch by batch, loading the next batches on a
+    # producer thread while the current one is embedded and upserted
     print("\nIngesting documents...")
-    doc_contents = [doc["content"] for doc in documents]
-    doc_metadatas = [doc["metadata"] for doc in documents]
-    doc_ids = [doc["id"] for doc in documents]
-    
-    count = vectordb.add_documents(
-        documents=doc_contents,
-        metadatas=doc_metadatas,
-        ids=doc_ids
+    batches = queue.Queue(maxsize=4)
+    loader = threading.Thread(
+        target=_produce_batches, args=(batch, doc_stream, batches), daemon=True
     )
+    loader.start()
+
+    count = 0
+    while True:
+        batch = batches.get()
+        if batch is None:
+            break
+        count += vectordb.add_documents(
+            documents=[doc["content"] for doc in batch],
+            metadatas=[doc["metadata"] for doc in batch],
+            ids=[doc["id"] for doc in batch]
+        )
+    loader.join()
     
     # Final stats
     stats = vectordb.get_stats()